@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+#Measures the memory used by the files of a synthetic core library
+#
+#Usage: python benchmarks/file_memory.py [--cores N] [--files N]
+#
+#A library with --cores cores, each with a fileset of --files files, is
+#written to a temporary directory. All cores are loaded, and the memory that
+#is still allocated afterwards is reported, both for section.File and for a
+#copy of the original File class that kept its attributes in a __dict__.
+#Requires Python 3.4 or later for tracemalloc
+import argparse
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fusesoc import section
+from fusesoc.config import Config
+from fusesoc.core import Core
+
+CORE = """CAPI=1
+[main]
+name = ::bench{}:0
+
+[fileset rtl]
+files = {}
+file_type = verilogSource
+"""
+
+FILE_ENTRIES = ['rtl/mod{}.v',
+                'rtl/mod{}.vhd[file_type=vhdlSource-2008,logical_name=libbench]',
+                'rtl/mod{}.vh[is_include_file]']
+
+class LegacyFile(object):
+    FILE_TYPES = section.File.FILE_TYPES
+    name      = ""
+    file_type = ""
+    is_include_file = False
+    logical_name = ""
+    def __init__(self, s):
+        self.is_include_file = False
+        if s[-1:] == ']':
+            _tmp = s[:-1].split('[')
+            if(len(_tmp) != 2):
+                raise SyntaxError("Expected '['")
+            self.name = _tmp[0]
+            for _arg in [x.strip() for x in _tmp[1].split(',')]:
+                if _arg == "is_include_file":
+                    self.is_include_file = True
+                elif '=' in _arg:
+                    _tmp = [x.strip() for x in _arg.split('=')]
+                    if _tmp[0] == 'file_type' and _tmp[1] not in self.FILE_TYPES:
+                        _s = "Unknown file type '{}'. Allowed file types are {}"
+                        raise SyntaxError(_s.format(_tmp[1], ', '.join(self.FILE_TYPES)))
+                    if _tmp[0] in ['file_type', 'logical_name']:
+                        setattr(self, _tmp[0], _tmp[1])
+                else:
+                    raise SyntaxError("Unexpected argument '"+_arg+"'")
+        else:
+            self.name = s
+
+def write_library(root, cores, files):
+    core_files = []
+    for i in range(cores):
+        entries = [FILE_ENTRIES[j % len(FILE_ENTRIES)].format(j) for j in range(files)]
+        core_file = os.path.join(root, 'bench{}'.format(i), 'bench{}.core'.format(i))
+        os.makedirs(os.path.dirname(core_file))
+        with open(core_file, 'w') as f:
+            f.write(CORE.format(i, ' '.join(entries)))
+        core_files.append(core_file)
+    return core_files
+
+def measure(core_files):
+    gc.collect()
+    tracemalloc.start()
+    cores = []
+    for core_file in core_files:
+        core = Core(core_file)
+        core.file_sets
+        cores.append(core)
+    gc.collect()
+    (current, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cores', type=int, default=100)
+    parser.add_argument('--files', type=int, default=1000)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    Config().cache_root = os.path.join(root, 'cache')
+    try:
+        core_files = write_library(os.path.join(root, 'lib'), args.cores, args.files)
+        n = args.cores * args.files
+
+        File = section.File
+        section.File = LegacyFile
+        legacy = measure(core_files)
+        section.File = File
+        compact = measure(core_files)
+    finally:
+        shutil.rmtree(root)
+
+    print("{} files in {} cores".format(n, args.cores))
+    print("{:<10} {:>8.1f} MiB {:>6.0f} bytes/file".format('legacy' , legacy/2.0**20, legacy/float(n)))
+    print("{:<10} {:>8.1f} MiB {:>6.0f} bytes/file".format('compact', compact/2.0**20, compact/float(n)))
+    print("Reduction: {:.0f}%".format(100.0 * (legacy - compact) / legacy))
+
+if __name__ == '__main__':
+    main()
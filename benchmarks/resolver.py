@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+#Compares the time to resolve dependencies with the fast path resolver and
+#with the SAT solver
+#
+#Usage: python benchmarks/resolver.py [--cores N] [--depth N] [--deps N] [--tops N]
+#
+#A synthetic library with --cores cores in --depth layers is written to a
+#temporary directory. Each core depends on up to --deps randomly chosen cores
+#in the layers below. The dependencies of --tops cores from the top layer are
+#then resolved with both resolvers, which must give identical results
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fusesoc.config import Config
+from fusesoc.coremanager import CoreDB, CoreManager
+
+CORE = """CAPI=1
+[main]
+name = ::{}:1.0
+depend = {}
+"""
+
+def write_library(root, cores, depth, deps):
+    rand = random.Random(1)
+    layers = [[] for i in range(depth)]
+    for i in range(cores):
+        layers[i % depth].append('core{}'.format(i))
+    for (n, layer) in enumerate(layers):
+        below = [c for l in layers[:n] for c in l]
+        for name in layer:
+            depend = rand.sample(below, min(deps, len(below)))
+            core_file = os.path.join(root, name, name+'.core')
+            os.makedirs(os.path.dirname(core_file))
+            with open(core_file, 'w') as f:
+                f.write(CORE.format(name, ' '.join(depend)))
+    return layers[-1]
+
+def resolve(db, tops, fast_path):
+    db.fast_path = fast_path
+    result = []
+    t = time.time()
+    for top in tops:
+        #Bypass the memoized results
+        result.append([str(c.name) for c in db._solve(top, '')])
+    return (time.time() - t, result)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cores', type=int, default=3000)
+    parser.add_argument('--depth', type=int, default=10)
+    parser.add_argument('--deps', type=int, default=3)
+    parser.add_argument('--tops', type=int, default=20)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    Config().cache_root = os.path.join(root, 'cache')
+    try:
+        top_names = write_library(os.path.join(root, 'lib'), args.cores, args.depth, args.deps)
+        cm = CoreManager()
+        cm.db = CoreDB()
+        cm.load_cores(os.path.join(root, 'lib'))
+    finally:
+        shutil.rmtree(root)
+
+    tops = [cm.db.find('::{}:1.0'.format(n)).name for n in top_names[:args.tops]]
+    #Build the solver pools up front so that only resolution is measured
+    for top in tops:
+        cm.db._get_pool(top, '')
+
+    (t_fast, fast) = resolve(cm.db, tops, True)
+    (t_sat , sat)  = resolve(cm.db, tops, False)
+    if fast != sat:
+        print("Fast path and solver gave different results")
+        exit(1)
+
+    n = sum(len(x) for x in fast)
+    print("{} cores, resolved {} top-levels with {:.1f} dependencies on average".format(
+        args.cores, len(tops), n / float(len(tops))))
+    print("{:<10} {:>8.1f} ms/top".format('fast path', t_fast*1000/len(tops)))
+    print("{:<10} {:>8.1f} ms/top".format('solver'   , t_sat*1000/len(tops)))
+    print("Speedup: {:.1f}x".format(t_sat/t_fast))
+
+if __name__ == '__main__':
+    main()
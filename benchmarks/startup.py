@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+#Measures how long it takes to start FuseSoC, and checks that the heavy
+#dependencies are not imported until they are needed
+#
+#Usage: python benchmarks/startup.py [--runs N] [--max-ms MS]
+#
+#Exits with a non-zero status if any of the deferred modules are imported at
+#startup, or if the best startup time is slower than --max-ms
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+#FuseSoC writes fusesoc.log to the current directory
+work_dir = tempfile.mkdtemp()
+
+#Modules that must only be imported in the code paths that use them
+DEFERRED = ['simplesat', 'okonomiyaki', 'ipyxact', 'multiprocessing']
+
+COMMANDS = [('import fusesoc.main', "import fusesoc.main"),
+            ('fusesoc --help', "import sys; sys.argv = ['fusesoc', '--help']\n"
+                               "import fusesoc.main\n"
+                               "try:\n"
+                               "    fusesoc.main.main()\n"
+                               "except SystemExit:\n"
+                               "    pass")]
+
+def _run(code):
+    env = dict(os.environ, PYTHONPATH=root)
+    t = time.time()
+    subprocess.check_call([sys.executable, '-c', code], env=env,
+                          stdout=subprocess.PIPE, cwd=work_dir)
+    return time.time() - t
+
+def loaded_modules():
+    code = ("import sys, fusesoc.main\n"
+            "print(' '.join(sys.modules))")
+    env = dict(os.environ, PYTHONPATH=root)
+    out = subprocess.check_output([sys.executable, '-c', code], env=env, cwd=work_dir)
+    return out.decode('utf-8').split()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-ms', type=float)
+    args = parser.parse_args()
+
+    failed = False
+    modules = loaded_modules()
+    for m in DEFERRED:
+        if [x for x in modules if x == m or x.startswith(m+'.')]:
+            print("{} is imported at startup".format(m))
+            failed = True
+
+    baseline = min(_run('pass') for i in range(args.runs))
+    print("{:<20} {:>8.1f} ms".format('python', baseline*1000))
+    for (name, code) in COMMANDS:
+        t = min(_run(code) for i in range(args.runs))
+        print("{:<20} {:>8.1f} ms".format(name, t*1000))
+        if args.max_ms and (t - baseline)*1000 > args.max_ms:
+            print("{} is slower than {} ms".format(name, args.max_ms))
+            failed = True
+    shutil.rmtree(work_dir)
+    exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
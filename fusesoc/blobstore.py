@@ -0,0 +1,221 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+
+if sys.version_info[0] >= 3:
+    import urllib.request as urllib
+    from urllib.error import URLError
+    from urllib.error import HTTPError
+else:
+    import urllib2 as urllib
+    from urllib2 import URLError
+    from urllib2 import HTTPError
+
+from fusesoc.config import Config
+from fusesoc.coreindex import file_hash
+from fusesoc.utils import atomic_open, pr_info, replace_file
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 1 << 16
+
+_checksum = re.compile(r'sha256:([0-9a-fA-F]{64})$')
+
+#Serializes updates of the URL index between fetch threads
+_lock = threading.Lock()
+
+def parse_checksum(checksum):
+    m = _checksum.match(checksum.strip())
+    if not m:
+        raise RuntimeError("Invalid checksum '{}'. Expected sha256:<64 hex digits>".format(checksum))
+    return m.group(1).lower()
+
+#Content-addressed store of downloaded files in cache_root/blobs. Each file is
+#stored once, named by its sha256. It is found again either by the checksum
+#from the core file, or by its URL as long as the server reports the same
+#ETag for it. Downloads are verified before they are stored
+class BlobStore(object):
+    def __init__(self, root=None):
+        if root is None:
+            root = os.path.join(Config().cache_root, 'blobs')
+        self.root = root
+        self.urls_file = os.path.join(root, 'urls.json')
+
+    def path(self, digest):
+        return os.path.join(self.root, 'sha256', digest)
+
+    def _read_urls(self):
+        try:
+            with open(self.urls_file) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _add_url(self, url, etag, digest):
+        with _lock:
+            urls = self._read_urls()
+            urls[url] = {'etag' : etag, 'sha256' : digest}
+            with atomic_open(self.urls_file) as f:
+                json.dump(urls, f, indent=2, sort_keys=True)
+
+    #Returns the path of a stored file with digest, or None if there is none.
+    #Files that have been corrupted since they were stored are removed
+    def _find(self, digest):
+        path = self.path(digest)
+        if not os.path.exists(path):
+            return None
+        if file_hash(path) != digest:
+            logger.warning("Removing corrupted file " + path)
+            os.remove(path)
+            return None
+        return path
+
+    def _open(self, url, headers={}):
+        try:
+            return urllib.urlopen(urllib.Request(url, headers=headers))
+        except HTTPError as e:
+            if e.code == 304:
+                return None
+            raise RuntimeError("Failed to download '{}'. '{}'".format(url, e.reason))
+        except URLError as e:
+            raise RuntimeError("Failed to download '{}'. '{}'".format(url, e.reason))
+
+    #Calls consume with a file object for the contents of url, which is read
+    #while the file is downloaded. consume may see data that fails
+    #verification, and anything it produces must be discarded if this
+    #raises. If checksum is given, the contents must match it. The download
+    #is only stored if it can be found again, i.e. if it has a checksum or
+    #the server sent an ETag. Returns the path of the stored file, or None
+    def get(self, url, checksum=None, consume=None):
+        headers = {}
+        stored = None
+        if checksum:
+            digest = parse_checksum(checksum)
+            stored = self._find(digest)
+        else:
+            digest = None
+            entry = self._read_urls().get(url)
+            if entry and self._find(entry['sha256']):
+                headers['If-None-Match'] = entry['etag']
+
+        if not stored:
+            response = self._open(url, headers)
+            if response is None:
+                stored = self.path(entry['sha256'])
+        if stored:
+            logger.debug("Using stored {} for {}".format(os.path.basename(stored), url))
+            if consume:
+                with open(stored, 'rb') as f:
+                    consume(f)
+            return stored
+
+        try:
+            etag = response.info().get('ETag')
+            digest = self._store(response, url, digest, consume, bool(checksum or etag))
+        finally:
+            response.close()
+        if not (checksum or etag):
+            return None
+        if etag:
+            self._add_url(url, etag, digest)
+        return self.path(digest)
+
+    def _store(self, f, url, expected=None, consume=None, keep=True):
+        tmp_path = None
+        try:
+            t = time.time()
+            if keep:
+                dirname = os.path.dirname(self.path(''))
+                _makedirs(dirname)
+                (fd, tmp_path) = tempfile.mkstemp(dir=dirname, prefix='.tmp')
+                out = os.fdopen(fd, 'wb')
+            else:
+                out = None
+            try:
+                tee = _Tee(f, out)
+                if consume:
+                    consume(tee)
+                while tee.read(BLOCK_SIZE):
+                    pass
+            finally:
+                if out:
+                    out.close()
+            t = max(time.time() - t, 1e-6)
+            digest = tee.hash.hexdigest()
+            if expected and digest != expected:
+                raise RuntimeError("Checksum mismatch for '{}'. Expected sha256:{}, got sha256:{}".format(url, expected, digest))
+            if keep:
+                replace_file(tmp_path, self.path(digest))
+        except:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        pr_info("Downloaded {:.1f} MiB in {:.1f} s ({:.1f} MiB/s)".format(
+            tee.size / 2.0**20, t, tee.size / 2.0**20 / t))
+        return digest
+
+#Passes everything that is read from f on to out, if given, and keeps its
+#sha256
+class _Tee(object):
+    def __init__(self, f, out):
+        self.f = f
+        self.out = out
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self.f.read()
+        else:
+            data = self.f.read(size)
+        self.hash.update(data)
+        if self.out:
+            self.out.write(data)
+        self.size += len(data)
+        return data
+
+def _makedirs(path):
+    if not os.path.exists(path):
+        try:
+            os.makedirs(path)
+        except OSError:
+            if not os.path.isdir(path):
+                raise
+
+#Extracts the tar archive at url to dst_dir while it is being downloaded,
+#without writing it to a temporary file first. The files are extracted to a
+#temporary directory next to dst_dir, which is renamed to dst_dir once the
+#download is complete and verified. With strip, the single top-level
+#directory of the archive becomes dst_dir
+def extract_tar(url, dst_dir, checksum=None, strip=False):
+    parent = os.path.dirname(os.path.abspath(dst_dir))
+    _makedirs(parent)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix='.tmp')
+    def _extract(f):
+        t = tarfile.open(fileobj=f, mode='r|*')
+        try:
+            t.extractall(tmp_dir)
+        finally:
+            t.close()
+    try:
+        BlobStore().get(url, checksum, _extract)
+        src = tmp_dir
+        if strip:
+            entries = os.listdir(tmp_dir)
+            if len(entries) != 1:
+                raise RuntimeError("Expected a single top-level directory in '{}'".format(url))
+            src = os.path.join(tmp_dir, entries[0])
+        os.rename(src, dst_dir)
+    except tarfile.TarError as e:
+        raise RuntimeError("Failed to extract '{}': {}".format(url, str(e)))
+    finally:
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
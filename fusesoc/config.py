@@ -30,6 +30,10 @@ class Config(object):
         self.cache_root = None
         self.cores_root = []
         self.systems_root = None
+        self.scan_jobs = 1
+        self.fetch_jobs = 1
+        self.resolve_cache = False
+        self.git_mirrors = False
 
         xdg_config_home = os.environ.get('XDG_CONFIG_HOME') or \
                           os.path.join(os.path.expanduser('~'), '.config')
@@ -57,6 +61,26 @@ class Config(object):
         except configparser.NoSectionError:
             pass
 
+        for item in ['scan_jobs', 'fetch_jobs']:
+            try:
+                setattr(self, item, config.getint('main', item))
+            except ValueError:
+                logger.warning("Invalid value for {}: '{}'".format(item, config.get('main', item)))
+            except configparser.NoOptionError:
+                pass
+            except configparser.NoSectionError:
+                pass
+
+        for item in ['resolve_cache', 'git_mirrors']:
+            try:
+                setattr(self, item, config.getboolean('main', item))
+            except ValueError:
+                logger.warning("Invalid value for {}: '{}'".format(item, config.get('main', item)))
+            except configparser.NoOptionError:
+                pass
+            except configparser.NoSectionError:
+                pass
+
         #Set fallback values
         if self.build_root is None:
             self.build_root   = os.path.abspath('build')
@@ -75,4 +99,8 @@ class Config(object):
         logger.debug('cache_root='+self.cache_root)
         logger.debug('cores_root='+':'.join(self.cores_root))
         logger.debug('systems_root='+self.systems_root if self.systems_root else "Not defined")
+        logger.debug('scan_jobs='+str(self.scan_jobs))
+        logger.debug('fetch_jobs='+str(self.fetch_jobs))
+        logger.debug('resolve_cache='+str(self.resolve_cache))
+        logger.debug('git_mirrors='+str(self.git_mirrors))
         self._init_done = True
@@ -1,10 +1,17 @@
 from collections import OrderedDict
+import hashlib
 import importlib
+import json
 import logging
 import os
 import shutil
+import sys
+
+if sys.version_info[0] >= 3:
+    from urllib.error import URLError
+else:
+    from urllib2 import URLError
 
-from ipyxact.ipyxact import Component
 from fusesoc import section
 from fusesoc import utils
 from fusesoc.config import Config
@@ -21,41 +28,196 @@ class FileSet(object):
         self.usage   = usage
         self.private = private
 
+def _setup_core(core):
+    utils.pr_info("Preparing " + str(core.name))
+    try:
+        core.setup()
+    except URLError as e:
+        return (core, "Problem while fetching '" + str(core.name) + "': " + str(e.reason))
+    except RuntimeError as e:
+        return (core, str(e))
+    except EnvironmentError as e:
+        #E.g. a connection that is reset in the middle of a download
+        return (core, "Problem while fetching '" + str(core.name) + "': " + str(e))
+    return (core, None)
+
+#Fetches the providers of cores, with up to jobs fetches running at the same
+#time. Fetching is mostly waiting for the network, so threads are enough.
+#Yields a (core, error) pair for each core as soon as it is done, where error
+#is None if the core was fetched successfully
+def setup_cores(cores, jobs=1):
+    jobs = min(jobs, len(cores))
+    if jobs > 1:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(jobs)
+        try:
+            for result in pool.imap_unordered(_setup_core, cores):
+                yield result
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        for core in cores:
+            yield _setup_core(core)
+
+#Parsing large IP-XACT files is slow, so the parts of a component that FuseSoC
+#cares about are cached in cache_root, keyed by the hash of the component file
+def _load_component(component_file):
+    with open(component_file, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    cache_file = os.path.join(Config().cache_root, 'ipxact', digest+'.json')
+
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file) as f:
+                return json.load(f)
+        except ValueError:
+            logger.warning("Ignoring corrupt IP-XACT cache file " + cache_file)
+
+    from ipyxact.ipyxact import Component
+    component = Component()
+    component.load(component_file)
+
+    file_sets = []
+    for file_set in component.fileSets.fileSet:
+        files = []
+        for f in file_set.file:
+            #FIXME: Harmonize underscore vs camelcase
+            files.append((f.name,
+                          f.fileType,
+                          f.isIncludeFile == 'true',
+                          f.logicalName))
+        file_sets.append((file_set.name, files))
+    data = {'description' : component.description,
+            'file_sets'   : file_sets}
+
+    try:
+        with utils.atomic_open(cache_file) as f:
+            json.dump(data, f)
+    except (IOError, OSError) as e:
+        logger.warning("Failed to cache IP-XACT component {}: {}".format(component_file, str(e)))
+    return data
+
 class Core:
-    def __init__(self, core_file):
+    #identity is what identity() returned for an earlier parse of core_file.
+    #If given, the core is built from it instead of parsing core_file
+    def __init__(self, core_file, identity=None):
         basename = os.path.basename(core_file)
-        self.depend = []
-        self.simulators = []
 
+        self.core_file = core_file
+        self.core_root = os.path.dirname(core_file)
+        self._loaded = False
+
+        # Only the parts needed to identify the core and resolve its
+        # dependencies are parsed here. Everything else is parsed by _load
+        # the first time any other attribute is accessed
+        if identity is None:
+            config = self._read_config()
+            #Kept for _load, so that the file isn't parsed twice
+            self._config = config
+            self.main = section.load_section(config, 'main', core_file)
+            tool_depend = {}
+            for s in config.sections():
+                cls = section.SECTION_MAP.get(s)
+                if cls and issubclass(cls, section.ToolSection) and \
+                   config.has_option(s, 'depend'):
+                    tool_depend[s] = config.get(s, 'depend')
+            identity = {'main'        : config.get_section('main'),
+                        'tool_depend' : tool_depend}
+        else:
+            self.main = section.MainSection(identity['main'])
+        self._identity = identity
+
+        if self.main.name:
+            self.name = Vlnv(self.main.name)
+        else:
+            self.name = Vlnv(basename.split('.core')[0])
+
+        self.sanitized_name = self.name.sanitized_name
+
+        self.depend     = tuple(self.main.depend)
+        self.simulators = self.main.simulators
+
+        self._tool_depend = {}
+        for (s, depend) in identity['tool_depend'].items():
+            self._tool_depend[s] = tuple(section.VlnvList(depend))
+        self._depends = {}
+
+    #The unparsed options that identify the core and its dependencies, as a
+    #dict of plain strings that can be stored as data
+    def identity(self):
+        return self._identity
+
+    def __getattr__(self, name):
+        if name.startswith('__') or self.__dict__.get('_loaded', True):
+            raise AttributeError(name)
+        self.load()
+        return getattr(self, name)
+
+    #The parsed config is only kept within the process that parsed the core
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_config', None)
+        return state
+
+    def _read_config(self):
+        basename = os.path.basename(self.core_file)
+        config = FusesocConfigParser(self.core_file)
+
+        #Add .system options to .core file
+        system_file = os.path.join(self.core_root, basename.split('.core')[0]+'.system')
+        if os.path.exists(system_file):
+            self._merge_system_file(system_file, config)
+        return config
+
+    #Parses the rest of the core, unless that has already been done. If
+    #parsing fails, the core is left as it was before so that the error is
+    #raised again on the next attempt instead of leaving a half-parsed core
+    def load(self):
+        if self._loaded:
+            return
+        attrs = set(self.__dict__)
+        self._loaded = True
+        try:
+            self._load()
+        except:
+            for k in set(self.__dict__) - attrs:
+                del self.__dict__[k]
+            self._loaded = False
+            raise
+
+    def _load(self):
         self.plusargs = None
         self.provider = None
         self.backend  = None
 
         for s in section.SECTION_MAP:
-            assert(not hasattr(self, s))
+            if s == 'main':
+                continue
             if(section.SECTION_MAP[s].named):
                 setattr(self, s, OrderedDict())
             else:
                 setattr(self, s, None)
 
-        self.core_root = os.path.dirname(core_file)
         self.files_root = self.core_root
 
         self.export_files = []
 
-        config = FusesocConfigParser(core_file)
-
-        #Add .system options to .core file
-        system_file = os.path.join(self.core_root, basename.split('.core')[0]+'.system')
-        if os.path.exists(system_file):
-            self._merge_system_file(system_file, config)
+        config = self.__dict__.get('_config')
+        if config is None:
+            config = self._read_config()
 
         #FIXME : Make simulators part of the core object
         self.simulator        = config.get_section('simulator')
         if not 'toplevel' in self.simulator:
             self.simulator['toplevel'] = 'orpsoc_tb'
 
-        for s in section.load_all(config, core_file):
+        for section_name in config.sections():
+            if section_name == 'main':
+                continue
+            s = section.load_section(config, section_name, self.core_file)
+            if not s:
+                continue
             if type(s) == tuple:
                 _l = getattr(self, s[0].TAG)
                 _l[s[1]] = s[0]
@@ -63,16 +225,6 @@ class Core:
             else:
                 setattr(self, s.TAG, s)
 
-        if self.main.name:
-            self.name = Vlnv(self.main.name)
-        else:
-            self.name = Vlnv(basename.split('.core')[0])
-
-        self.sanitized_name = self.name.sanitized_name
-
-        self.depend     = self.main.depend
-        self.simulators = self.main.simulators
-
         if self.main.backend:
             self.backend = getattr(self, self.main.backend)
 
@@ -98,32 +250,60 @@ class Core:
         if self.provider:
             self.files_root = self.provider.files_root
 
-        # We need the component file here, but it might not be
-        # available until the core is fetched. Try to fetch first if any
-        # of the component files are missing
-        if False in [os.path.exists(f) for f in self.main.component]:
-            self.setup()
-
-        for f in self.main.component:
-            self._parse_component(os.path.join(self.files_root, f))
+        # The component files might not be available until the core is
+        # fetched. Never fetch here, as that would make merely loading a
+        # core hit the network. Leave them to setup() instead
+        self._component_pending = bool(self.main.component)
+        if not False in [os.path.exists(os.path.join(self.files_root, f)) for f in self.main.component]:
+            self._parse_components()
+        self.__dict__.pop('_config', None)
+
+    def tool_depend(self, tool):
+        return self._tool_depend.get(tool, ())
+
+    #Tools with tool-specific dependencies
+    def dependency_tools(self):
+        return sorted(self._tool_depend)
+
+    #Common and tool-specific dependencies of the core. The tuples are built
+    #once per tool and never modified, so resolving dependencies always sees
+    #the same view of the core
+    def depends(self, tool):
+        depends = self._depends.get(tool)
+        if depends is None:
+            depends = self.depend + self.tool_depend(tool)
+            self._depends[tool] = depends
+        return depends
 
     def cache_status(self):
         if self.provider:
-            return self.provider.status()
+            status = self.provider.status()
         else:
-            return 'local'
-
-    def setup(self):
-        if self.provider:
+            status = 'local'
+        if self._component_pending:
+            status += ' (component pending)'
+        return status
+
+    #With fetch=False, the core only finishes parsing files that were
+    #fetched by another core that shares its cache directory
+    def setup(self, fetch=True):
+        if self.provider and fetch:
             if self.provider.fetch():
                 self.patch(self.files_root)
+        if self._component_pending:
+            self._parse_components()
+
+    def _parse_components(self):
+        for f in self.main.component:
+            self._parse_component(os.path.join(self.files_root, f))
+        self._component_pending = False
 
     def export(self, dst_dir):
         if os.path.exists(dst_dir):
             shutil.rmtree(dst_dir)
 
         #FIXME: Separate tb_files to an own directory tree (src/tb/core_name ?)
-        src_files = self.export_files
+        src_files = list(self.export_files)
 
         for s in section.SECTION_MAP:
             obj = getattr(self, s)
@@ -154,7 +334,7 @@ class Core:
     def patch(self, dst_dir):
         #FIXME: Use native python patch instead
         patch_root = os.path.join(self.core_root, 'patches')
-        patches = self.main.patches
+        patches = list(self.main.patches)
         if os.path.exists(patch_root):
             for p in sorted(os.listdir(patch_root)):
                 patches.append(os.path.join('patches', p))
@@ -289,34 +469,32 @@ class Core:
             self.export_files += [f.name for f in _files]
 
     def _parse_component(self, component_file):
-        component = Component()
-        component.load(component_file)
+        component = _load_component(component_file)
 
         if not self.main.description:
-            self.main.description = component.description
+            self.main.description = component['description']
 
         _file_sets = []
-        for file_set in component.fileSets.fileSet:
-            _name = file_set.name
-            for f in file_set.file:
-                self.export_files.append(f.name)
-                #FIXME: Harmonize underscore vs camelcase
-                f.file_type = f.fileType
-                if f.isIncludeFile == 'true':
-                    f.is_include_file = True
-                else:
-                    f.is_include_file = False
-                f.logical_name = f.logicalName
+        for (name, files) in component['file_sets']:
+            _files = []
+            for (file_name, file_type, is_include_file, logical_name) in files:
+                self.export_files.append(file_name)
+                f = section.File(file_name)
+                f.file_type       = utils.intern_str(file_type)
+                f.is_include_file = is_include_file
+                f.logical_name    = utils.intern_str(logical_name)
+                _files.append(f)
             #FIXME: Handle duplicates. Resolution function? (merge/replace, prio ipxact/core)
             _taken = False
             for fs in self.file_sets:
-                if fs.name == file_set.name:
+                if fs.name == name:
                     _taken = True
             if not _taken:
-                _file_sets.append(FileSet(name = file_set.name,
-                                          file = file_set.file[:],
+                _file_sets.append(FileSet(name = name,
+                                          file = _files,
                                           usage = ['sim', 'synth']))
         self.file_sets += _file_sets
+
     def info(self):
 
         show_list = lambda l: "\n                        ".join([str(x) for x in l])
@@ -344,6 +522,8 @@ class Core:
                 else:
                     print("== " + s + " ==")
                     print(obj)
+        if self._component_pending:
+            print("IP-XACT component: pending until the core is fetched")
         print("File sets:")
         for s in self.file_sets:
             print("""
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+
+from fusesoc.core import Core
+from fusesoc.utils import atomic_open
+
+logger = logging.getLogger(__name__)
+
+#Bump this whenever the layout of the index changes
+INDEX_VERSION = 8
+
+def file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime, st.st_size)
+
+def system_file(core_file):
+    basename = os.path.basename(core_file)
+    return os.path.join(os.path.dirname(core_file),
+                        basename.split('.core')[0]+'.system')
+
+#Persistent cache of parsed cores. Each entry holds the identity of a core
+#together with the stamps (mtime and size) of the files it was parsed from,
+#and is only used as long as none of these files have changed on disk. The
+#identity is stored unparsed, so that environment variables in paths are
+#expanded again whenever the core is loaded. Entries for core files that
+#weren't asked for since the index was loaded are dropped when it is saved
+class CoreIndex(object):
+    def __init__(self, index_file):
+        self.index_file = index_file
+        self._entries = {}
+        self._seen = set()
+        self._dirty = False
+
+        if os.path.exists(index_file):
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_file, 'rb') as f:
+                (version, entries) = pickle.load(f)
+        except Exception as e:
+            logger.warning("Ignoring unreadable core index '{}': {}".format(
+                self.index_file, str(e)))
+            return
+        if version != INDEX_VERSION:
+            logger.debug("Ignoring core index '{}' with version {}".format(
+                self.index_file, version))
+            return
+        self._entries = entries
+
+    def get(self, core_file):
+        self._seen.add(core_file)
+        entry = self._entries.get(core_file)
+        if entry is None:
+            return None
+        (stamps, identity) = entry
+        for (path, stamp) in stamps:
+            if file_stamp(path) != stamp:
+                logger.debug("{} has changed. Reparsing {}".format(path, core_file))
+                return None
+        try:
+            return Core(core_file, identity)
+        except Exception as e:
+            logger.warning("Failed to load {} from core index: {}".format(core_file, str(e)))
+            return None
+
+    def add(self, core_file, core):
+        self._seen.add(core_file)
+        stamps = [(p, file_stamp(p)) for p in [core_file,
+                                               system_file(core_file)]]
+        self._entries[core_file] = (stamps, core.identity())
+        self._dirty = True
+
+    def save(self):
+        for core_file in [f for f in self._entries if not f in self._seen]:
+            del self._entries[core_file]
+            self._dirty = True
+        if not self._dirty:
+            return
+        try:
+            with atomic_open(self.index_file, 'wb') as f:
+                pickle.dump((INDEX_VERSION, self._entries), f,
+                            pickle.HIGHEST_PROTOCOL)
+        except (IOError, OSError) as e:
+            logger.warning("Failed to write core index '{}': {}".format(
+                self.index_file, str(e)))
+            return
+        self._dirty = False
+
+#Precompiled manifest of all cores in a library, written to the root of the
+#library by `fusesoc library index`. Libraries can come from anywhere, so the
+#manifest is plain JSON with the identity of each core, which is all that is
+#parsed up front. Paths are stored relative to the root so that the library
+#can be mounted anywhere. A file whose stamp doesn't match is compared by its
+#sha256 instead, and if any file has changed, the whole manifest is ignored
+MANIFEST_NAME = '.fusesoc-manifest'
+MANIFEST_VERSION = 1
+
+def file_hash(path):
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def manifest_file(root):
+    return os.path.join(root, MANIFEST_NAME)
+
+def write_manifest(root, cores):
+    entries = []
+    for (core_file, core) in cores:
+        files = []
+        for path in [core_file, system_file(core_file)]:
+            files.append([os.path.relpath(path, root),
+                          file_stamp(path),
+                          file_hash(path)])
+        entries.append({'files' : files,
+                        'core'  : core.identity()})
+    with atomic_open(manifest_file(root)) as f:
+        json.dump({'version' : MANIFEST_VERSION,
+                   'cores'   : entries}, f, indent=1, sort_keys=True)
+
+def read_manifest(root):
+    try:
+        with open(manifest_file(root)) as f:
+            data = json.load(f)
+    except (IOError, OSError):
+        return None
+    except ValueError as e:
+        logger.warning("Ignoring unreadable manifest in '{}': {}".format(root, str(e)))
+        return None
+    if not isinstance(data, dict) or data.get('version') != MANIFEST_VERSION:
+        logger.debug("Ignoring manifest in '{}' with unknown version".format(root))
+        return None
+
+    cores = []
+    try:
+        for entry in data['cores']:
+            for (rel_path, stamp, digest) in entry['files']:
+                path = os.path.join(root, rel_path)
+                #Stamps are stored as lists in JSON
+                if file_stamp(path) != (stamp and tuple(stamp)) and \
+                   file_hash(path) != digest:
+                    logger.info("{} has changed. Ignoring manifest in {}".format(path, root))
+                    return None
+            core_file = os.path.join(root, entry['files'][0][0])
+            cores.append((core_file, Core(core_file, entry['core'])))
+    except Exception as e:
+        logger.warning("Ignoring invalid manifest in '{}': {}".format(root, str(e)))
+        return None
+    return cores
+
+#Persistent cache of dependency resolutions. Each entry holds the core files
+#of the resolved cores in order, together with all names that can be reached
+#from the top-level core and the stamps of all cores with these names. The
+#entry is only used as long as these are unchanged, so that a core that is
+#added for a name that couldn't be found before invalidates it as well
+class ResolutionCache(object):
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self._entries = {}
+        self._dirty = False
+
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file) as f:
+                    (version, entries) = json.load(f)
+            except (IOError, OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable resolution cache '{}': {}".format(
+                    cache_file, str(e)))
+                return
+            if version == INDEX_VERSION:
+                self._entries = entries
+
+    def _fingerprint(self, db, top_core, tool):
+        (names, cores) = db._reachable(top_core, tool)
+        files = sorted(c.core_file for c in cores)
+        return {'names' : sorted(names),
+                'files' : [[f, file_stamp(f), file_stamp(system_file(f))]
+                           for f in files]}
+
+    def get(self, key, db, top_core, tool):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        cores = []
+        for core_file in entry['cores']:
+            core = db.find_file(core_file)
+            if core is None:
+                return None
+            cores.append(core)
+        #Stamps are stored as lists in JSON
+        fingerprint = json.loads(json.dumps(self._fingerprint(db, top_core, tool)))
+        if fingerprint != entry['fingerprint']:
+            logger.debug("Cores for '{}' have changed".format(key))
+            return None
+        return cores
+
+    def add(self, key, db, top_core, tool, cores):
+        self._entries[key] = {'cores'       : [c.core_file for c in cores],
+                              'fingerprint' : self._fingerprint(db, top_core, tool)}
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        try:
+            with atomic_open(self.cache_file) as f:
+                json.dump((INDEX_VERSION, self._entries), f)
+        except (IOError, OSError) as e:
+            logger.warning("Failed to write resolution cache '{}': {}".format(
+                self.cache_file, str(e)))
+            return
+        self._dirty = False
@@ -1,20 +1,20 @@
 import collections
+import fnmatch
 import logging
 import os
 
-from okonomiyaki.versions import EnpkgVersion
-
-from simplesat.constraints import PrettyPackageStringParser, Requirement
-from simplesat.dependency_solver import DependencySolver
-from simplesat.errors import NoPackageFound, SatisfiabilityError
-from simplesat.package import PackageMetadata
-from simplesat.pool import Pool
-from simplesat.repository import Repository
-from simplesat.request import Request
+try:
+    from os import scandir
+except ImportError:
+    from scandir import scandir
 
 from fusesoc.config import Config
 from fusesoc.core import Core
+from fusesoc.coreindex import CoreIndex, ResolutionCache, read_manifest, write_manifest
+from fusesoc.lockfile import LOCK_FILE, LockFile
 from fusesoc.utils import pr_warn
+from fusesoc.vlnv import Vlnv
+from fusesoc.watcher import watched_core_files
 
 logger = logging.getLogger(__name__)
 
@@ -25,19 +25,86 @@ class DependencyError(Exception):
         return repr(self.value)
 
 class CoreDB(object):
+    #Resolve simple dependency graphs without the solver
+    fast_path = True
+
     def __init__(self):
         self._cores = {}
+        self._package_names = {}
+        self._package_versions = {}
+        self._enpkg_versions = {}
+
+        #Solver packages are built once for every core and reused between
+        #solves. Cores with tool-specific dependencies get an extra package
+        #for each tool. The pools only contain the cores that can be reached
+        #from a top-level core, and are cached for each top-level name and
+        #tool until the set of cores has changed
+        self._generation = 0
+        self._packages = {}
+        self._tool_packages = {}
+        self._pools = {}
+
+        #Results of earlier solves, valid for as long as the generation is
+        #unchanged. Optionally backed by a persistent ResolutionCache
+        self._solutions = {}
+        self.resolution_cache = None
+
+        #Available cores by package name, and by core file
+        self._lookup = (None, {}, {})
+
+        #Dependency graph index, updated as cores are added and removed.
+        #For each core, its requirements as (tool, vlnv) pairs, where tool
+        #is '' for common dependencies. For each package name, the cores
+        #with requirements on it
+        self._requirements = {}
+        self._required_by = {}
 
     #simplesat doesn't allow ':', '-' or leading '_'
     def _package_name(self, vlnv):
-        _name = "{}_{}_{}".format(vlnv.vendor,
-                                  vlnv.library,
-                                  vlnv.name).lstrip("_")
-        return _name.replace('-','__')
+        _name = self._package_names.get(vlnv)
+        if _name is None:
+            _name = "{}_{}_{}".format(vlnv.vendor,
+                                      vlnv.library,
+                                      vlnv.name).lstrip("_")
+            _name = _name.replace('-','__')
+            self._package_names[vlnv] = _name
+        return _name
 
     def _package_version(self, vlnv):
-        return "{}-{}".format(vlnv.version,
-                              vlnv.revision)
+        _version = self._package_versions.get(vlnv)
+        if _version is None:
+            _version = "{}-{}".format(vlnv.version,
+                                      vlnv.revision)
+            self._package_versions[vlnv] = _version
+        return _version
+
+    #The version as the solver sees it, so that the graph index orders
+    #versions exactly like dependency resolution does
+    def _enpkg_version(self, vlnv):
+        version = self._enpkg_versions.get(vlnv)
+        if version is None:
+            from okonomiyaki.versions import EnpkgVersion
+            version = EnpkgVersion.from_string(self._package_version(vlnv))
+            self._enpkg_versions[vlnv] = version
+        return version
+
+    #Returns True if the core identified by vlnv satisfies requirement
+    def _satisfies(self, vlnv, requirement):
+        if self._package_name(vlnv) != self._package_name(requirement):
+            return False
+        (a, b) = (self._enpkg_version(vlnv), self._enpkg_version(requirement))
+        relation = requirement.relation
+        if relation == '==':
+            return a == b
+        elif relation == '>=':
+            return a >= b
+        elif relation == '<=':
+            return a <= b
+        elif relation == '>':
+            return a > b
+        elif relation == '<':
+            return a < b
+        return False
 
     def _parse_depend(self, depends):
         #FIXME: Handle conflicts
@@ -50,53 +117,283 @@ class CoreDB(object):
         return ", ".join(deps)
 
     def add(self, core):
-        name = str(core.name)
-        logger.debug("Adding core " + name)
+        name = core.name
+        logger.debug("Adding core " + str(name))
         if name in self._cores:
             _s = "Replacing {} in {} with the version found in {}"
-            logger.debug(_s.format(name,
+            logger.debug(_s.format(str(name),
                                    self._cores[name].core_root,
                                    core.core_root))
+            self._unindex(name)
         self._cores[name] = core
+        self._index(core)
+        self._generation += 1
+
+    def remove(self, name):
+        if not isinstance(name, Vlnv):
+            name = Vlnv(name)
+        if name in self._cores:
+            logger.debug("Removing core " + str(name))
+            self._unindex(name)
+            del self._cores[name]
+            self._generation += 1
+
+    def _index(self, core):
+        requirements = [('', d) for d in core.depend]
+        for tool in core.dependency_tools():
+            requirements += [(tool, d) for d in core.tool_depend(tool)]
+        self._requirements[core.name] = requirements
+        for (tool, d) in requirements:
+            users = self._required_by.setdefault(self._package_name(d), {})
+            users.setdefault(core.name, []).append((tool, d))
+
+    def _unindex(self, name):
+        for (tool, d) in self._requirements.pop(name, []):
+            _name = self._package_name(d)
+            users = self._required_by.get(_name, {})
+            users.pop(name, None)
+            if not users:
+                self._required_by.pop(_name, None)
+
+    #The cores that satisfy the requirements of the core identified by
+    #name when used with tool, or with any tool if tool is None. If among is
+    #given, only cores that are in it are returned
+    def requires(self, name, tool=None, among=None):
+        found = {}
+        for (_tool, d) in self._requirements.get(name, []):
+            if d.conflict or not (tool is None or _tool in ['', tool]):
+                continue
+            for core in self.candidates(d):
+                if self._satisfies(core.name, d) and (among is None or core.name in among):
+                    found[core.name] = core
+        return sorted(found.values(), key=lambda c: c.name)
+
+    #The cores with a requirement, for tool or for any tool if tool is
+    #None, that is satisfied by any available core matching vlnv
+    def required_by(self, vlnv, tool=None):
+        targets = [c.name for c in self.candidates(vlnv) if self._satisfies(c.name, vlnv)]
+        found = []
+        users = self._required_by.get(self._package_name(vlnv), {})
+        for (name, requirements) in users.items():
+            for (_tool, d) in requirements:
+                if d.conflict or not (tool is None or _tool in ['', tool]):
+                    continue
+                if [x for x in targets if self._satisfies(x, d)]:
+                    found.append(self._cores[name])
+                    break
+        return sorted(found, key=lambda c: c.name)
+
+    #All cores that directly or indirectly require a core matching vlnv
+    def all_required_by(self, vlnv, tool=None):
+        found = {}
+        queue = [vlnv]
+        while queue:
+            for core in self.required_by(queue.pop(), tool):
+                if not core.name in found:
+                    found[core.name] = core
+                    queue.append(core.name.with_relation('=='))
+        return sorted(found.values(), key=lambda c: c.name)
 
     def find(self, vlnv=None):
         if vlnv:
-            found = self._cores[str(vlnv)]
+            if not isinstance(vlnv, Vlnv):
+                vlnv = Vlnv(vlnv)
+            found = self._cores[vlnv]
         else:
             found = list(self._cores.values())
         return found
 
-    def solve(self, top_core, tool):
-        repo = Repository()
-        for core in self._cores.values():
-            package_str = "{} {}-{}".format(self._package_name(core.name),
-                                            core.name.version,
-                                            core.name.revision)
-            _depends = core.depend
-            try:
-                _depends += getattr(core, tool).depend
-            except (AttributeError, KeyError):
-                pass
+    def _get_lookup(self):
+        (generation, by_name, by_file) = self._lookup
+        if generation != self._generation:
+            by_name = {}
+            by_file = {}
+            for core in self._cores.values():
+                _name = self._package_name(core.name)
+                by_name.setdefault(_name, []).append(core)
+                by_file[core.core_file] = core
+            self._lookup = (self._generation, by_name, by_file)
+        return (by_name, by_file)
+
+    #All available versions of the core identified by vlnv
+    def candidates(self, vlnv):
+        (by_name, by_file) = self._get_lookup()
+        return by_name.get(self._package_name(vlnv), [])
 
-            if _depends:
-                _s = "; depends ( {} )"
-                package_str += _s.format(self._parse_depend(_depends))
-            parser = PrettyPackageStringParser(EnpkgVersion.from_string)
+    def find_file(self, core_file):
+        (by_name, by_file) = self._get_lookup()
+        return by_file.get(core_file)
 
-            package = parser.parse_to_package(package_str)
-            package.core = core
+    def _package(self, cache, key, core, depends, parser):
+        (cached_core, package) = cache.get(key, (None, None))
+        if cached_core is core:
+            return package
+        package_str = "{} {}".format(self._package_name(core.name),
+                                     self._package_version(core.name))
+        if depends:
+            _s = "; depends ( {} )"
+            package_str += _s.format(self._parse_depend(depends))
+        package = parser.parse_to_package(package_str)
+        package.core = core
+        cache[key] = (core, package)
+        return package
+
+    #All names and all versions of all cores that can be reached from any
+    #version of top_core, through the common or tool-specific dependencies.
+    #Names that no core provides are included
+    def _reachable(self, top_core, tool):
+        (by_name, by_file) = self._get_lookup()
+        cores = []
+        seen = set()
+        names = [self._package_name(top_core)]
+        while names:
+            name = names.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            for core in by_name.get(name, []):
+                cores.append(core)
+                for d in core.depends(tool):
+                    names.append(self._package_name(d))
+        return (seen, cores)
 
+    #Returns the pool, repository and installed repository for solving
+    #the dependencies of top_core for tool
+    def _get_pool(self, top_core, tool):
+        key = (self._package_name(top_core), tool)
+        (generation, solver_pool) = self._pools.get(key, (None, None))
+        if generation == self._generation:
+            return solver_pool
+
+        #Forget packages and pools from earlier generations
+        for k in [k for k in self._packages if not k in self._cores]:
+            del self._packages[k]
+        for k in [k for k in self._tool_packages if not k[1] in self._cores]:
+            del self._tool_packages[k]
+        for k in [k for (k, v) in self._pools.items() if v[0] != self._generation]:
+            del self._pools[k]
+
+        from okonomiyaki.versions import EnpkgVersion
+        from simplesat.constraints import PrettyPackageStringParser
+        from simplesat.pool import Pool
+        from simplesat.repository import Repository
+
+        (names, cores) = self._reachable(top_core, tool)
+        logger.debug("Building solver pool with {} of {} cores for {} with tool '{}'".format(
+            len(cores), len(self._cores), key[0], tool))
+        parser = PrettyPackageStringParser(EnpkgVersion.from_string)
+        repo = Repository()
+        for core in cores:
+            if core.tool_depend(tool):
+                package = self._package(self._tool_packages,
+                                        (tool, core.name),
+                                        core,
+                                        core.depends(tool),
+                                        parser)
+            else:
+                package = self._package(self._packages,
+                                        core.name,
+                                        core,
+                                        core.depend,
+                                        parser)
             repo.add_package(package)
 
-        request = Request()
+        installed_repository = Repository()
+        pool = Pool([repo])
+        pool.add_repository(installed_repository)
+        solver_pool = (pool, repo, installed_repository)
+        self._pools[key] = (self._generation, solver_pool)
+        return solver_pool
+
+    def solve(self, top_core, tool):
+        key = "{}|{}".format(tool, top_core.depstr())
+        (generation, cores) = self._solutions.get(key, (None, None))
+        if generation != self._generation:
+            cores = None
+            if self.resolution_cache:
+                cores = self.resolution_cache.get(key, self, top_core, tool)
+            if cores is None:
+                cores = self._solve(top_core, tool)
+                if self.resolution_cache:
+                    self.resolution_cache.add(key, self, top_core, tool, cores)
+            else:
+                logger.debug("Using cached resolution for " + key)
+            self._solutions[key] = (self._generation, cores)
+        return list(cores)
+
+    #Most dependency graphs have exactly one version of each core and no
+    #conflicts. These are resolved by a plain topological sort, which gives
+    #the same order as the solver: Cores without dependencies first, then
+    #the ones that only depend on those and so on, with ties broken by the
+    #order of the packages in the pool. Returns None when the solver is
+    #needed
+    def _fast_solve(self, requirement, tool, pool, repo):
+        from simplesat.constraints import Requirement
+
+        names = set()
+        for package in repo:
+            if package.name in names:
+                return None
+            names.add(package.name)
+            core = package.core
+            for d in core.depends(tool):
+                if d.conflict:
+                    return None
+
+        top = pool.what_provides(requirement)
+        if len(top) != 1:
+            return None
+
+        graph = {}
+        packages = list(top)
+        while packages:
+            package = packages.pop()
+            if package in graph:
+                continue
+            graph[package] = set()
+            for constraints in package.install_requires:
+                deps = pool.what_provides(Requirement.from_constraints(constraints))
+                if len(deps) != 1:
+                    return None
+                graph[package].add(deps[0])
+                packages.append(deps[0])
+
+        cores = []
+        while graph:
+            group = [p for (p, deps) in graph.items() if not deps]
+            if not group:
+                #Let the solver report the cycle
+                return None
+            for package in sorted(group, key=pool.package_id):
+                cores.append(package.core)
+                del graph[package]
+            for deps in graph.values():
+                deps.difference_update(group)
+        return cores
+
+    def _solve(self, top_core, tool):
+        #The solver is slow to import and only needed when resolving
+        #dependencies, so keep it out of the startup path of FuseSoC
+        from simplesat.constraints import Requirement
+        from simplesat.dependency_solver import DependencySolver
+        from simplesat.errors import NoPackageFound, SatisfiabilityError
+        from simplesat.request import Request
+
+        (pool, repo, installed_repository) = self._get_pool(top_core, tool)
+
         _top_dep = "{} {} {}".format(self._package_name(top_core),
                                      top_core.relation,
                                      self._package_version(top_core))
         requirement = Requirement._from_string(_top_dep)
+
+        if self.fast_path:
+            cores = self._fast_solve(requirement, tool, pool, repo)
+            if cores is not None:
+                return cores
+            logger.debug("Using solver for dependencies of " + top_core.depstr())
+
+        request = Request()
         request.install(requirement)
-        installed_repository = Repository()
-        pool = Pool([repo])
-        pool.add_repository(installed_repository)
         solver = DependencySolver(pool, repo, installed_repository)
 
         try:
@@ -109,9 +406,57 @@ class CoreDB(object):
 
         return [op.package.core for op in transaction.operations]
 
+#Directories that never contain cores
+SKIP_DIRS = ['.git', '.hg', '.svn', '.bzr', 'CVS', '__pycache__']
+
+def _read_ignore_file(root):
+    patterns = []
+    ignore_file = os.path.join(root, '.fusesocignore')
+    if os.path.exists(ignore_file):
+        with open(ignore_file) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    patterns.append(line.strip('/'))
+    return patterns
+
+#Patterns containing a '/' are matched against the path relative to the
+#library root. Other patterns are matched against the file or directory name
+def _is_ignored(path, root, patterns):
+    if not patterns:
+        return False
+    name = os.path.basename(path)
+    rel_path = os.path.relpath(path, root).replace(os.sep, '/')
+    for pattern in patterns:
+        if '/' in pattern:
+            if fnmatch.fnmatch(rel_path, pattern):
+                return True
+        elif fnmatch.fnmatch(name, pattern):
+            return True
+    return False
+
+def _init_worker(config):
+    #Make sure that worker processes see the same configuration as the parent
+    Config().__dict__.update(config)
+
+def _parse_error(core_file, e):
+    if isinstance(e, ImportError):
+        return 'Failed to register "{}" due to unknown provider: {}'.format(core_file, str(e))
+    elif isinstance(e, SyntaxError):
+        return "Failed to parse " + core_file + ": " + e.msg
+    return "Failed to parse " + core_file + ": " + str(e)
+
+def _parse_core(core_file):
+    try:
+        return (Core(core_file), None)
+    except (SyntaxError, ImportError) as e:
+        return (None, _parse_error(core_file, e))
+
 class CoreManager(object):
     _instance = None
     _cores_root = []
+    _index = None
+    _lockfile = None
     tool = ''
     db = CoreDB()
 
@@ -120,29 +465,128 @@ class CoreManager(object):
             cls._instance = super(CoreManager, cls).__new__(cls, *args, **kwargs)
         return cls._instance
 
+    def _get_index(self):
+        index_file = os.path.join(Config().cache_root, 'core_index')
+        if self._index is None or self._index.index_file != index_file:
+            self._index = CoreIndex(index_file)
+        return self._index
+
     def load_core(self, file):
         if os.path.exists(file):
+            self._load_core_files([os.path.abspath(file)])
+
+    def parse_core_files(self, core_files):
+        index = self._get_index()
+        cores = {}
+        unparsed = []
+        for core_file in core_files:
+            core = index.get(core_file)
+            if core is None:
+                unparsed.append(core_file)
+            else:
+                cores[core_file] = core
+
+        jobs = Config().scan_jobs
+        if jobs > 1 and len(unparsed) > 1:
+            import multiprocessing
+            logger.debug("Parsing {} cores using {} processes".format(len(unparsed), jobs))
+            pool = multiprocessing.Pool(min(jobs, len(unparsed)),
+                                        _init_worker,
+                                        (vars(Config()),))
             try:
-                core = Core(file)
-                self.db.add(core)
-            except SyntaxError as e:
-                w = "Failed to parse " + file + ": " + e.msg
-                pr_warn(w)
-                logger.warning(w)
-            except ImportError as e:
-                pr_warn('Failed to register "{}" due to unknown provider: {}'.format(file, str(e)))
-        
+                results = pool.map(_parse_core, unparsed)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [_parse_core(f) for f in unparsed]
+
+        for (core_file, (core, error)) in zip(unparsed, results):
+            if error:
+                pr_warn(error)
+                logger.warning(error)
+            else:
+                index.add(core_file, core)
+                cores[core_file] = core
+        return cores
+
+    def _load_core_files(self, core_files):
+        cores = self.parse_core_files(core_files)
+
+        #Add in discovery order so that later cores replace earlier ones
+        for core_file in core_files:
+            if core_file in cores:
+                self.db.add(cores[core_file])
+
+    def find_core_files(self, path, visited_dirs=None):
+        ignore_patterns = _read_ignore_file(path)
+        core_files = []
+        seen = set()
+        stack = [path]
+        while stack:
+            d = stack.pop()
+            try:
+                st = os.stat(d)
+            except OSError:
+                continue
+            #Symlinks are followed, but a directory is never scanned twice
+            if (st.st_dev, st.st_ino) in seen:
+                logger.debug("Skipping already scanned directory " + d)
+                continue
+            seen.add((st.st_dev, st.st_ino))
+            if visited_dirs is not None:
+                visited_dirs.append(d)
+
+            try:
+                entries = sorted(scandir(d), key=lambda e: e.name)
+            except OSError as e:
+                logger.warning("Failed to read directory {}: {}".format(d, str(e)))
+                continue
+            subdirs = []
+            found = []
+            for entry in entries:
+                if entry.is_dir():
+                    if entry.name in SKIP_DIRS or \
+                       _is_ignored(entry.path, path, ignore_patterns):
+                        continue
+                    subdirs.append(entry.path)
+                elif entry.name.endswith('.core') and \
+                     not _is_ignored(entry.path, path, ignore_patterns):
+                    found.append(os.path.abspath(entry.path))
+            #Don't look for more cores below a directory containing a core
+            if found:
+                core_files += found
+            else:
+                stack += reversed(subdirs)
+        return core_files
+
     def load_cores(self, path):
         if path:
             logger.debug("Checking for cores in " + path)
         if os.path.isdir(path) == False:
             raise IOError(path + " is not a directory")
-        for root, dirs, files in os.walk(path, followlinks=True):
-            for f in files:
-                if f.endswith('.core'):
-                    d = os.path.basename(root)
-                    self.load_core(os.path.join(root, f))
-                    del dirs[:]
+        manifest = read_manifest(path)
+        if manifest is not None:
+            logger.debug("Using manifest for " + path)
+            for (core_file, core) in manifest:
+                self.db.add(core)
+            return
+        core_files = watched_core_files(path)
+        if core_files is None:
+            core_files = self.find_core_files(path)
+        else:
+            logger.debug("Using list of cores from library watcher for " + path)
+            core_files = [f for f in core_files if os.path.exists(f)]
+        self._load_core_files(core_files)
+
+    #Parse all cores in a library and write them to a manifest in the root
+    #of the library. Returns the number of cores in the manifest
+    def write_manifest(self, path):
+        core_files = self.find_core_files(path)
+        cores = self.parse_core_files(core_files)
+        write_manifest(path, [(f, cores[f]) for f in core_files if f in cores])
+        self.save_index()
+        return len(cores)
 
     def add_cores_root(self, path):
         if path is None:
@@ -155,22 +599,113 @@ class CoreManager(object):
                 continue
             abspath = os.path.abspath(os.path.expanduser(p))
             if not abspath in self._cores_root:
-                self.load_cores(os.path.expanduser(p))
+                self.load_cores(abspath)
                 self._cores_root += [abspath]
+        self.save_index()
+
+    def save_index(self):
+        self._get_index().save()
 
     def get_cores_root(self):
         return self._cores_root
 
-    def get_depends(self, core):
-        return self.db.solve(core, self.tool)
+    def _init_resolution_cache(self):
+        if Config().resolve_cache:
+            cache_file = os.path.join(Config().cache_root, 'resolutions.json')
+            cache = self.db.resolution_cache
+            if cache is None or cache.cache_file != cache_file:
+                self.db.resolution_cache = ResolutionCache(cache_file)
+        else:
+            self.db.resolution_cache = None
+
+    def _solve(self, core, tool):
+        self._init_resolution_cache()
+        cores = self.db.solve(core, tool)
+        if self.db.resolution_cache:
+            self.db.resolution_cache.save()
+        return cores
+
+    #Resolves the dependencies for a list of (core, tool) pairs in one
+    #session. All requests share the solver packages, pools and memoized
+    #results of the core database, and the resolution cache is only written
+    #once at the end. Returns a (cores, error) pair for each request, in
+    #the same order, where error is None if the request could be resolved
+    def solve_many(self, requests):
+        self._init_resolution_cache()
+        results = []
+        for (core, tool) in requests:
+            try:
+                results.append((self.db.solve(core, tool), None))
+            except DependencyError as e:
+                _s = "'{}' or any of its dependencies requires '{}', but this core was not found"
+                results.append((None, _s.format(core.depstr(), str(e.value))))
+            except RuntimeError as e:
+                results.append((None, str(e)))
+        if self.db.resolution_cache:
+            self.db.resolution_cache.save()
+        return results
+
+    def _get_lockfile(self):
+        lock_file = os.path.abspath(LOCK_FILE)
+        if not os.path.exists(lock_file):
+            return None
+        if self._lockfile is None or self._lockfile.lock_file != lock_file:
+            self._lockfile = LockFile(lock_file)
+        return self._lockfile
+
+    #Cores are only parsed in full the first time they are used. Cores
+    #that fail to parse are removed with a warning, like at scan time.
+    #Returns the cores that could be parsed
+    def load_fully(self, cores):
+        loaded = []
+        for core in cores:
+            try:
+                core.load()
+                loaded.append(core)
+            except (SyntaxError, ImportError, RuntimeError) as e:
+                error = _parse_error(core.core_file, e)
+                pr_warn(error)
+                logger.warning(error)
+                self.db.remove(core.name)
+        return loaded
+
+    def _get_depends(self, core, tool):
+        try:
+            lockfile = self._get_lockfile()
+        except RuntimeError as e:
+            _s = "Ignoring {}: {}. Run 'fusesoc lock' to update it"
+            pr_warn(_s.format(LOCK_FILE, str(e)))
+            logger.warning(_s.format(LOCK_FILE, str(e)))
+            lockfile = None
+        if lockfile:
+            try:
+                cores = lockfile.get(core, tool, self.db)
+            except RuntimeError as e:
+                _s = "{} is out of date ({}). Resolving dependencies of {} again. Run 'fusesoc lock' to update it"
+                pr_warn(_s.format(LOCK_FILE, str(e), str(core)))
+                logger.warning(_s.format(LOCK_FILE, str(e), str(core)))
+                cores = None
+            if cores is not None:
+                logger.debug("Using locked dependencies for {}".format(str(core)))
+                return cores
+        return self._solve(core, tool)
+
+    def get_depends(self, core, tool=None):
+        if tool is None:
+            tool = self.tool
+        #Resolve again without the cores that failed to parse
+        while True:
+            cores = self._get_depends(core, tool)
+            if len(self.load_fully(cores)) == len(cores):
+                return cores
 
     def get_cores(self):
-        return {str(x.name) : x for x in self.db.find()}
+        return {str(x.name) : x for x in self.load_fully(self.db.find())}
 
     def get_core(self, name):
-        c = self.db.solve(name, "")[-1]
-        c.name.relation = "=="
+        c = self.get_depends(name, "")[-1]
+        c.name = c.name.with_relation("==")
         return c
 
     def get_systems(self):
-        return {str(x.name) : x for x in self.db.find() if x.backend}
+        return {str(x.name) : x for x in self.db.find() if x.main.backend}
@@ -2,20 +2,10 @@ import argparse
 from collections import OrderedDict
 import os
 import shutil
-import sys
-
-if sys.version_info[0] >= 3:
-    import urllib.request as urllib
-    from urllib.error import URLError
-    from urllib.error import HTTPError
-else:
-    import urllib
-    from urllib2 import URLError
-    from urllib2 import HTTPError
 
 from fusesoc.config import Config
+from fusesoc.core import setup_cores
 from fusesoc.coremanager import CoreManager
-from fusesoc.utils import pr_info
 
 class FileAction(argparse.Action):
     def __call__(self, parser, namespace, values, option_string=None):
@@ -61,18 +51,12 @@ class EdaTool(object):
         else:
             os.makedirs(self.work_root)
 
-        for core in self.cores:
-            pr_info("Preparing " + str(core.name))
-            dst_dir = os.path.join(self.src_root, core.sanitized_name)
-            try:
-                core.setup()
-            except URLError as e:
-                raise RuntimeError("Problem while fetching '" + core.name + "': " + str(e.reason))
-            except HTTPError as e:
-                raise RuntimeError("Problem while fetching '" + core.name + "': " + str(e.reason))
-
+        #Each core is exported as soon as it has been fetched
+        for (core, error) in setup_cores(self.cores, Config().fetch_jobs):
+            if error:
+                raise RuntimeError(error)
             if self.export:
-                core.export(dst_dir)
+                core.export(os.path.join(self.src_root, core.sanitized_name))
 
     def parse_args(self, args, prog, paramtypes):
         typedict = {'bool' : {'action' : 'store_true'},
@@ -0,0 +1,71 @@
+import json
+import os
+
+from fusesoc.coreindex import file_hash, system_file
+from fusesoc.utils import atomic_open
+from fusesoc.vlnv import Vlnv
+
+LOCK_FILE = 'fusesoc.lock'
+LOCK_VERSION = 1
+
+#Resolved dependencies of systems, written by `fusesoc lock`. For each
+#system and tool, the lock file holds the ordered list of cores together with
+#the sha256 of their .core and .system files. A locked list is only used as
+#long as all cores are still found with the same hashes
+class LockFile(object):
+    #Raises RuntimeError if an existing lock file can't be read, unless read
+    #is False, which starts from an empty lock file
+    def __init__(self, lock_file, read=True):
+        self.lock_file = lock_file
+        self.systems = {}
+
+        if read and os.path.exists(lock_file):
+            with open(lock_file) as f:
+                try:
+                    data = json.load(f)
+                except ValueError as e:
+                    raise RuntimeError("Failed to parse lock file '{}': {}".format(lock_file, str(e)))
+            if not isinstance(data, dict) or data.get('version') != LOCK_VERSION or \
+               not isinstance(data.get('systems'), dict):
+                raise RuntimeError("Unsupported version of lock file '{}'".format(lock_file))
+            self.systems = data['systems']
+
+    def _hashes(self, core):
+        return (file_hash(core.core_file),
+                file_hash(system_file(core.core_file)))
+
+    def has(self, system, tool):
+        return tool in self.systems.get(str(system), {})
+
+    #Returns the locked cores for system and tool, or None if there is no
+    #such entry. Raises RuntimeError if the entry is stale
+    def get(self, system, tool, db):
+        entry = self.systems.get(str(system), {}).get(tool)
+        if entry is None:
+            return None
+        cores = []
+        for item in entry:
+            try:
+                core = db.find(Vlnv(item['name']))
+            except KeyError:
+                raise RuntimeError("{} is no longer available".format(item['name']))
+            if list(self._hashes(core)) != [item['sha256'], item['system_sha256']]:
+                raise RuntimeError("{} has been modified".format(item['name']))
+            cores.append(core)
+        return cores
+
+    def set(self, system, tool, cores):
+        entry = []
+        for core in cores:
+            (core_hash, system_hash) = self._hashes(core)
+            entry.append({'name'          : str(core.name),
+                          'sha256'        : core_hash,
+                          'system_sha256' : system_hash})
+        self.systems.setdefault(str(system), {})[tool] = entry
+
+    def save(self):
+        with atomic_open(self.lock_file) as f:
+            json.dump({'version' : LOCK_VERSION,
+                       'systems' : self.systems},
+                      f, indent=2, sort_keys=True)
+            f.write('\n')
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 import argparse
 import importlib
+import json
 import os
 import platform
 import subprocess
@@ -15,8 +16,11 @@ else:
     sys.path[0:0] = ['@pythondir@']
 
 from fusesoc.config import Config
+from fusesoc.core import setup_cores
 from fusesoc.coremanager import CoreManager, DependencyError
+from fusesoc.lockfile import LOCK_FILE, LockFile
 from fusesoc.vlnv import Vlnv
+from fusesoc.watcher import LibraryWatcher
 from fusesoc.utils import pr_err, pr_info, pr_warn, Launcher
 
 import logging
@@ -94,7 +98,90 @@ def pgm(args):
     except RuntimeError as e:
         pr_err("Failed to program the FPGA: " + str(e))
 
+def _fetch_many(args):
+    cm = CoreManager()
+    failed = []
+    if args.all:
+        cores = sorted(cm.get_cores().values(), key=lambda c: c.name)
+    else:
+        try:
+            requests = _read_batch_file(args.systems)
+        except (IOError, OSError) as e:
+            pr_err("Failed to read '{}': {}".format(args.systems, str(e)))
+            exit(1)
+        except SyntaxError as e:
+            pr_err(str(e))
+            exit(1)
+
+        #Without a tool, fetch what is needed for building and for all
+        #simulators of the system. Simulators that can't be resolved are
+        #skipped, like in 'fusesoc lock'
+        solve = []
+        for (name, tool) in requests:
+            try:
+                core = cm.get_core(Vlnv(name))
+            except (DependencyError, RuntimeError, SyntaxError) as e:
+                failed.append((name, "Failed to resolve: " + str(e)))
+                continue
+            for t in ([tool] if tool else [''] + core.simulators):
+                solve.append((core.name, t, bool(tool) or not t))
+        results = cm.solve_many([(name, tool) for (name, tool, required) in solve])
+
+        cores = {}
+        for ((name, tool, required), (_cores, error)) in zip(solve, results):
+            if error:
+                if required:
+                    failed.append((str(name), error))
+                else:
+                    pr_warn("Not fetching dependencies of {} for {}: {}".format(str(name), tool, error))
+            else:
+                for core in _cores:
+                    cores[core.name] = core
+        cores = cm.load_fully(sorted(cores.values(), key=lambda c: c.name))
+
+    #Cores that share a cache directory are only fetched once
+    providers = {}
+    for core in cores:
+        if core.provider:
+            providers.setdefault(core.files_root, []).append(core)
+    n = len(providers)
+    pr_info("Fetching {} of {} cores using {} jobs".format(n, len(cores), Config().fetch_jobs))
+
+    done = 0
+    first = [c[0] for c in providers.values()]
+    for (core, error) in setup_cores(first, Config().fetch_jobs):
+        done += 1
+        if error:
+            failed.append((str(core.name), error))
+            pr_warn("[{}/{}] Failed to fetch {}".format(done, n, str(core.name)))
+            continue
+        pr_info("[{}/{}] Fetched {}".format(done, n, str(core.name)))
+        #The other cores that share the directory must not fetch it again,
+        #which would wipe and refetch it for non-cachable providers
+        for other in providers[core.files_root][1:]:
+            try:
+                other.setup(fetch=False)
+            except RuntimeError as e:
+                failed.append((str(other.name), str(e)))
+
+    if failed:
+        pr_err("Failed to fetch {} cores:".format(len(failed)))
+        for (name, error) in failed:
+            pr_err("  {}: {}".format(name, error))
+        exit(1)
+    pr_info("Fetched {} cores".format(n))
+
 def fetch(args):
+    if args.all or args.systems:
+        if args.core:
+            pr_err("A core can't be given together with --all or --systems")
+            exit(1)
+        _fetch_many(args)
+        return
+    if not args.core:
+        pr_err("No core to fetch. Give a core, --all or --systems")
+        exit(1)
+
     core = _get_core(args.core)
 
     try:
@@ -154,6 +241,174 @@ def init(args):
         f.write("cores_root = {}\n".format(' '.join(_repo_paths)))
     pr_info("FuseSoC is ready to use!")
 
+def library_index(args):
+    root = os.path.abspath(os.path.expanduser(args.root))
+    if not os.path.isdir(root):
+        pr_err("'{}' is not a directory".format(root))
+        exit(1)
+    try:
+        n = CoreManager().write_manifest(root)
+    except (IOError, OSError) as e:
+        pr_err("Failed to write manifest for '{}': {}".format(root, str(e)))
+        exit(1)
+    pr_info("Wrote manifest with {} cores to '{}'".format(n, root))
+
+def deps(args):
+    core = _get_core(args.core)
+    tool = args.tool or ''
+    try:
+        cores = CoreManager()._solve(core.name, tool)
+    except DependencyError as e:
+        pr_err("'" + args.core + "' or any of its dependencies requires '" + str(e.value) + "', but this core was not found")
+        exit(1)
+    except RuntimeError as e:
+        pr_err(str(e))
+        exit(1)
+
+    if not args.tree:
+        for c in cores:
+            print(str(c.name))
+        return
+
+    #Only show the versions that were picked by the resolver. Subtrees that
+    #have already been shown are not repeated
+    db = CoreManager().db
+    resolved = set(c.name for c in cores)
+    shown = set()
+    def _print_tree(c, prefix, last):
+        print(prefix + ("`-- " if last else "|-- ") + str(c.name) +
+              (" (*)" if c.name in shown else ""))
+        if c.name in shown:
+            return
+        shown.add(c.name)
+        children = db.requires(c.name, tool, resolved)
+        for (i, child) in enumerate(children):
+            _print_tree(child, prefix + ("    " if last else "|   "), i == len(children)-1)
+
+    print(str(core.name))
+    shown.add(core.name)
+    children = db.requires(core.name, tool, resolved)
+    for (i, child) in enumerate(children):
+        _print_tree(child, "", i == len(children)-1)
+
+def rdeps(args):
+    try:
+        vlnv = Vlnv(args.core)
+    except SyntaxError as e:
+        pr_err(str(e))
+        exit(1)
+    db = CoreManager().db
+    if not db.candidates(vlnv):
+        pr_err("Unable to find core '{}'".format(args.core))
+        exit(1)
+    if args.direct:
+        cores = db.required_by(vlnv, args.tool)
+    else:
+        cores = db.all_required_by(vlnv, args.tool)
+    if args.systems:
+        cores = [c for c in cores if c.main.backend]
+    for c in cores:
+        print(str(c.name))
+
+def _read_batch_file(batch_file):
+    #One request per line: a core name, optionally followed by a tool.
+    #Empty lines and lines starting with # are ignored
+    requests = []
+    with open(batch_file) as f:
+        for (n, line) in enumerate(f, 1):
+            line = line.split('#')[0].split()
+            if not line:
+                continue
+            if len(line) > 2:
+                raise SyntaxError("{}:{}: Expected a core name and an optional tool".format(batch_file, n))
+            requests.append((line[0], line[1] if len(line) > 1 else ''))
+    return requests
+
+def resolve(args):
+    requests = [(name, args.tool) for name in args.system]
+    if args.batch:
+        try:
+            requests += _read_batch_file(args.batch)
+        except (IOError, OSError) as e:
+            pr_err("Failed to read '{}': {}".format(args.batch, str(e)))
+            exit(1)
+        except SyntaxError as e:
+            pr_err(str(e))
+            exit(1)
+    if not requests:
+        pr_err("No cores to resolve")
+        exit(1)
+
+    try:
+        vlnvs = [(Vlnv(name), tool) for (name, tool) in requests]
+    except SyntaxError as e:
+        pr_err(str(e))
+        exit(1)
+
+    results = CoreManager().solve_many(vlnvs)
+
+    failed = 0
+    output = []
+    for ((name, tool), (cores, error)) in zip(requests, results):
+        entry = {'system' : name, 'tool' : tool}
+        if error:
+            failed += 1
+            entry['error'] = error
+        else:
+            entry['cores'] = [str(c.name) for c in cores]
+        output.append(entry)
+
+    if args.json:
+        print(json.dumps(output, indent=2))
+    else:
+        for entry in output:
+            print("{}{}:".format(entry['system'],
+                                 " ({})".format(entry['tool']) if entry['tool'] else ""))
+            if 'error' in entry:
+                pr_err(entry['error'])
+            else:
+                for core in entry['cores']:
+                    print("  " + core)
+    if failed:
+        pr_err("Failed to resolve {} of {} requests".format(failed, len(requests)))
+        exit(1)
+
+def lock(args):
+    core = _get_core(args.system)
+    if args.tool:
+        tools = args.tool
+    else:
+        #Dependencies for building, followed by all supported simulators
+        tools = [''] + core.simulators
+    try:
+        lockfile = LockFile(LOCK_FILE)
+    except RuntimeError as e:
+        pr_warn("{}. Writing a new lock file".format(str(e)))
+        lockfile = LockFile(LOCK_FILE, read=False)
+    for tool in tools:
+        try:
+            cores = CoreManager()._solve(core.name, tool)
+        except (DependencyError, RuntimeError) as e:
+            if isinstance(e, DependencyError):
+                msg = "'" + args.system + "' or any of its dependencies requires '" + e.value + "', but this core was not found"
+            else:
+                msg = str(e)
+            #Simulators that were not asked for explicitly are skipped
+            if args.tool:
+                pr_err(msg)
+                exit(1)
+            pr_warn("Not locking dependencies for {}: {}".format(tool or 'building', msg))
+            continue
+        lockfile.set(core.name, tool, cores)
+        pr_info("Locked {} cores for {}{}".format(len(cores),
+                                                  str(core.name),
+                                                  " ({})".format(tool) if tool else ""))
+    try:
+        lockfile.save()
+    except (IOError, OSError) as e:
+        pr_err("Failed to write {}: {}".format(LOCK_FILE, str(e)))
+        exit(1)
+
 def list_paths(args):
     cores_root = CoreManager().get_cores_root()
     print("\n".join(cores_root))
@@ -253,10 +508,25 @@ def update(args):
             except subprocess.CalledProcessError:
                 pass
 
+def watch(args):
+    cm = CoreManager()
+    cores_root = cm.get_cores_root()
+    if not cores_root:
+        pr_err("cores_root is not defined")
+        exit(1)
+    #Make sure the watcher state is cleaned up when killed
+    signal.signal(signal.SIGTERM, abort_handler)
+    LibraryWatcher(cm, cores_root, args.interval, args.poll).run()
+
 def run(args):
     cm = CoreManager()
     config = Config()
 
+    if args.scan_jobs:
+        config.scan_jobs = args.scan_jobs
+    if args.fetch_jobs:
+        config.fetch_jobs = args.fetch_jobs
+
     # Get the environment variable for further cores
     env_cores_root = []
     if os.getenv("FUSESOC_CORES"):
@@ -308,6 +578,8 @@ def main():
     parser.add_argument('--64', help='Force 64 bit mode for invoked tools', action='store_true')
     parser.add_argument('--monochrome', help='Don\'t use color for messages', action='store_true')
     parser.add_argument('--verbose', help='More info messages', action='store_true')
+    parser.add_argument('--jobs', dest='scan_jobs', type=int, help='Number of processes to use when parsing core libraries')
+    parser.add_argument('--fetch-jobs', type=int, help='Number of cores to fetch in parallel')
 
     #General options
     parser_build = subparsers.add_parser('build', help='Build an FPGA load module')
@@ -326,7 +598,10 @@ def main():
     parser_pgm.set_defaults(func=pgm)
 
     parser_fetch = subparsers.add_parser('fetch', help='Fetch a remote core and its dependencies to local cache')
-    parser_fetch.add_argument('core')
+    parser_fetch.add_argument('--all', action='store_true', help='Fetch all cores in the core libraries')
+    parser_fetch.add_argument('--systems', help='Fetch the dependencies of all systems listed in a file, with one system and an optional tool per line')
+    parser_fetch.add_argument('--jobs', dest='fetch_jobs', type=int, default=argparse.SUPPRESS, help='Number of cores to fetch in parallel')
+    parser_fetch.add_argument('core', nargs='?')
     parser_fetch.set_defaults(func=fetch)
 
     parser_list_systems = subparsers.add_parser('list-systems', help='List available systems')
@@ -344,6 +619,37 @@ def main():
     parser_core_info.add_argument('core')
     parser_core_info.set_defaults(func=core_info)
 
+    parser_library = subparsers.add_parser('library', help='Manage core libraries')
+    library_subparsers = parser_library.add_subparsers()
+    parser_library_index = library_subparsers.add_parser('index', help='Write a precompiled manifest of all cores in a library to the root of the library')
+    parser_library_index.add_argument('root')
+    parser_library_index.set_defaults(func=library_index)
+
+    parser_deps = subparsers.add_parser('deps', help='List the resolved dependencies of a core')
+    parser_deps.add_argument('--tool', help='Include the dependencies for this tool')
+    parser_deps.add_argument('--tree', action='store_true', help='Show the dependencies as a tree')
+    parser_deps.add_argument('core')
+    parser_deps.set_defaults(func=deps)
+
+    parser_rdeps = subparsers.add_parser('rdeps', help='List the cores that depend on a core')
+    parser_rdeps.add_argument('--tool', help='Only consider the common dependencies and the dependencies for this tool (default: all tools)')
+    parser_rdeps.add_argument('--direct', action='store_true', help='Only list cores that depend directly on the core')
+    parser_rdeps.add_argument('--systems', action='store_true', help='Only list systems')
+    parser_rdeps.add_argument('core')
+    parser_rdeps.set_defaults(func=rdeps)
+
+    parser_resolve = subparsers.add_parser('resolve', help='Resolve and list the dependencies of one or more cores')
+    parser_resolve.add_argument('--batch', help='Read additional requests from a file with one core name and an optional tool per line')
+    parser_resolve.add_argument('--tool', default='', help='Tool to resolve the cores given on the command line for')
+    parser_resolve.add_argument('--json', action='store_true', help='Print the results as JSON')
+    parser_resolve.add_argument('system', nargs='*')
+    parser_resolve.set_defaults(func=resolve)
+
+    parser_lock = subparsers.add_parser('lock', help='Resolve the dependencies of a system and record them in ' + LOCK_FILE)
+    parser_lock.add_argument('--tool', action='append', help='Lock the dependencies for this tool. Can be given multiple times (default: building and all simulators of the system)')
+    parser_lock.add_argument('system')
+    parser_lock.set_defaults(func=lock)
+
     parser_list_paths = subparsers.add_parser('list-paths', help='Displays the search order for core root paths')
     parser_list_paths.set_defaults(func=list_paths)
 
@@ -363,6 +669,11 @@ def main():
     parser_update = subparsers.add_parser('update', help='Update the FuseSoC core libraries')
     parser_update.set_defaults(func=update)
 
+    parser_watch = subparsers.add_parser('watch', help='Watch the core libraries and keep the core index up to date for other FuseSoC commands')
+    parser_watch.add_argument('--interval', type=float, default=2.0, help='Seconds between checks for changes when polling (default 2)')
+    parser_watch.add_argument('--poll', action='store_true', help='Poll for changes instead of using inotify')
+    parser_watch.set_defaults(func=watch)
+
     parsed_args = parser.parse_args()
     if hasattr(parsed_args, 'func'):
         run(parsed_args)
@@ -1,6 +1,18 @@
+from fusesoc.config import Config
 from fusesoc.utils import pr_info, pr_warn, Launcher
+import hashlib
 import os.path
 import shutil
+import subprocess
+import threading
+
+#Only one thread at a time may work on a mirror
+_lock = threading.Lock()
+_mirror_locks = {}
+
+def _mirror_lock(mirror):
+    with _lock:
+        return _mirror_locks.setdefault(mirror, threading.Lock())
 
 class Git(object):
     def __init__(self, core_name, config, core_root, cache_root):
@@ -40,6 +52,9 @@ class Git(object):
             #TODO: throw an exception here
 
     def _checkout(self, local_dir):
+        if Config().git_mirrors:
+            self._checkout_worktree(local_dir)
+            return
 
         #TODO : Sanitize URL
         pr_info("Checking out " + self.repo + " to " + local_dir)
@@ -49,6 +64,46 @@ class Git(object):
             args = ['-C', local_dir, 'checkout', '-q', self.version]
             Launcher('git', args).run()
 
+    #With git_mirrors, all cores from the same repository share one bare
+    #mirror in cache_root/git, and each version is checked out from it as
+    #a worktree, so that the objects are only fetched once
+    def _mirror(self):
+        name = os.path.basename(self.repo.rstrip('/'))
+        if name.endswith('.git'):
+            name = name[:-4]
+        digest = hashlib.sha256(self.repo.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(Config().cache_root, 'git', '{}-{}.git'.format(name, digest))
+
+    def _git(self, mirror, args):
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.call(['git', '-C', mirror] + args,
+                                   stdout=devnull, stderr=devnull) == 0
+
+    #Tags and commits don't change, so the mirror doesn't need to be updated
+    #if it already has them. Branches and the default branch always do
+    def _has_version(self, mirror):
+        if not self.version:
+            return False
+        if self._git(mirror, ['show-ref', '-q', '--verify', 'refs/heads/' + self.version]):
+            return False
+        return self._git(mirror, ['rev-parse', '-q', '--verify', self.version + '^{commit}'])
+
+    def _checkout_worktree(self, local_dir):
+        mirror = self._mirror()
+        with _mirror_lock(mirror):
+            if not os.path.isdir(mirror):
+                pr_info("Mirroring " + self.repo + " to " + mirror)
+                Launcher('git', ['clone', '-q', '--mirror', self.repo, mirror]).run()
+            elif not self.cachable or not self._has_version(mirror):
+                pr_info("Updating mirror of " + self.repo)
+                Launcher('git', ['-C', mirror, 'fetch', '-q', '--prune', 'origin']).run()
+
+            pr_info("Checking out " + self.repo + " to " + local_dir)
+            #Forget worktrees whose directories have been removed from the cache
+            Launcher('git', ['-C', mirror, 'worktree', 'prune']).run()
+            Launcher('git', ['-C', mirror, 'worktree', 'add', '-q', '--detach', '-f',
+                             os.path.abspath(local_dir), self.version or 'HEAD']).run()
+
     def status(self):
         if not self.cachable:
             return 'outofdate'
@@ -1,15 +1,7 @@
+from fusesoc.blobstore import extract_tar
 from fusesoc.utils import pr_info, pr_warn
 import os.path
 import shutil
-import sys
-import tarfile
-
-if sys.version_info[0] >= 3:
-    import urllib.request as urllib
-    from urllib.error import URLError
-else:
-    import urllib
-    from urllib2 import URLError
 
 URL = 'https://github.com/{user}/{repo}/archive/{version}.tar.gz'
 
@@ -18,6 +10,7 @@ class GitHub(object):
         self.user   = config.get('user')
         self.repo   = config.get('repo')
         self.branch = config.get('branch')
+        self.checksum = config.get('checksum')
 
         self.cachable = True
         if 'cachable' in config:
@@ -60,18 +53,9 @@ class GitHub(object):
                          version=self.version)
         pr_info("Downloading {}/{} from github".format(self.user,
                                                        self.repo))
-        try:
-            (filename, headers) = urllib.urlretrieve(url)
-        except URLError as e:
-            raise RuntimeError("Failed to download '{}'. '{}'".format(url, e.reason))
-        t = tarfile.open(filename)
-        (cache_root, core) = os.path.split(local_dir)
-
-        #Ugly hack to get the first part of the directory name of the extracted files
-        tmp = t.getnames()[0]
-        t.extractall(cache_root)
-        os.rename(os.path.join(cache_root, tmp),
-                  os.path.join(cache_root, core))
+        #The archive has a single top-level directory named after the
+        #repository and version, which becomes the cache directory
+        extract_tar(url, local_dir, self.checksum, strip=True)
 
     def status(self):
         if not self.cachable:
@@ -1,26 +1,18 @@
+from fusesoc.blobstore import BlobStore, extract_tar
 from fusesoc.utils import pr_info, pr_warn
 import os.path
-import sys
-import tarfile
 import zipfile
 import shutil
+import tempfile
 import logging
 
 logger = logging.getLogger(__name__)
 
-if sys.version_info[0] >= 3:
-    import urllib.request as urllib
-    from urllib.error import URLError
-    from urllib.error import HTTPError
-else:
-    import urllib
-    from urllib2 import URLError
-    from urllib2 import HTTPError
-
 class ProviderURL(object):
     def __init__(self, core_name, config, core_root, cache_root):
         self.url      = config.get('url')
         self.filetype = config.get('filetype')
+        self.checksum = config.get('checksum')
         if 'corename' in config:
             self.version = config.get('corename')
         else:
@@ -53,35 +45,36 @@ class ProviderURL(object):
 
     def _checkout(self, local_dir, core_name):
         pr_info("Checking out " + self.url + " to " + local_dir)
-        try:
-            (filename, headers) = urllib.urlretrieve(self.url)
-        except URLError as e:
-            raise RuntimeError("Failed to download '{}'. '{}'".format(url, e.reason))
-        except HTTPError:
-            raise RuntimeError("Failed to download '{}'. '{}'".format(url, e.reason))
-
-        (cache_root, core) = os.path.split(local_dir)
-
         if self.filetype == 'tar':
-            t = tarfile.open(filename)
-            t.extractall(local_dir)
-        elif self.filetype == 'zip':
-            with zipfile.ZipFile(filename, "r") as z:
-                z.extractall(local_dir)
-        elif self.filetype == 'simple':
-            # Splits the string at the last occurrence of sep, and
-            # returns a 3-tuple containing the part before the separator,
-            # the separator itself, and the part after the separator.
-            # If the separator is not found, return a 3-tuple containing
-            # two empty strings, followed by the string itself
-            segments = self.url.rpartition('/')
-            self.path = os.path.join(local_dir)
-            os.makedirs(self.path)
-            self.path = os.path.join(self.path, segments[2])
-            shutil.copy2(filename, self.path)
-        else:
+            extract_tar(self.url, local_dir, self.checksum)
+            return
+
+        if not self.filetype in ['zip', 'simple']:
             raise RuntimeError("Unknown file type '" + self.filetype + "' in [provider] section")
 
+        #zipfile needs a seekable file, and nothing may be written to the
+        #cache before the download has been verified, so keep it in an
+        #anonymous temporary file until then
+        with tempfile.TemporaryFile() as tmp:
+            BlobStore().get(self.url, self.checksum,
+                            lambda f: shutil.copyfileobj(f, tmp))
+            tmp.seek(0)
+            if self.filetype == 'zip':
+                with zipfile.ZipFile(tmp, "r") as z:
+                    z.extractall(local_dir)
+            elif self.filetype == 'simple':
+                # Splits the string at the last occurrence of sep, and
+                # returns a 3-tuple containing the part before the separator,
+                # the separator itself, and the part after the separator.
+                # If the separator is not found, return a 3-tuple containing
+                # two empty strings, followed by the string itself
+                segments = self.url.rpartition('/')
+                self.path = os.path.join(local_dir)
+                os.makedirs(self.path)
+                self.path = os.path.join(self.path, segments[2])
+                with open(self.path, 'wb') as f:
+                    shutil.copyfileobj(tmp, f)
+
 
     def status(self):
         if not os.path.isdir(self.files_root):
@@ -1,4 +1,6 @@
+from collections import OrderedDict
 import os
+import re
 from fusesoc.config import Config
 from fusesoc import utils
 from fusesoc.utils import pr_warn, pr_info, unique_dirs
@@ -25,32 +27,40 @@ class File(object):
         'xci',
         'xdc',
         ]
-    name      = ""
-    file_type = ""
-    is_include_file = False
-    logical_name = ""
+    __slots__ = ['name', 'file_type', 'is_include_file', 'logical_name']
+
     def __init__(self, s):
+        self.file_type       = ""
         self.is_include_file = False
+        self.logical_name    = ""
         if s[-1:] == ']':
-            _tmp = s[:-1].split('[')
-            if(len(_tmp) != 2):
+            m = _FILE_ATTRS.match(s)
+            if not m:
                 raise SyntaxError("Expected '['")
-            self.name = _tmp[0]
-            for _arg in [x.strip() for x in _tmp[1].split(',')]:
+            self.name = m.group(1)
+            for _arg in [x.strip() for x in m.group(2).split(',')]:
                 if _arg == "is_include_file":
                     self.is_include_file = True
                 elif '=' in _arg:
-                    _tmp = [x.strip() for x in _arg.split('=')]
-                    if _tmp[0] == 'file_type' and _tmp[1] not in self.FILE_TYPES:
-                        _s = "Unknown file type '{}'. Allowed file types are {}"
-                        raise SyntaxError(_s.format(_tmp[1], ', '.join(self.FILE_TYPES)))
-                    if _tmp[0] in ['file_type', 'logical_name']:
-                        setattr(self, _tmp[0], _tmp[1])
+                    (key, value) = [x.strip() for x in _arg.split('=', 1)]
+                    if key == 'file_type':
+                        if value not in _FILE_TYPES:
+                            _s = "Unknown file type '{}'. Allowed file types are {}"
+                            raise SyntaxError(_s.format(value, ', '.join(self.FILE_TYPES)))
+                        self.file_type = _FILE_TYPES[value]
+                    elif key == 'logical_name':
+                        self.logical_name = utils.intern_str(value)
                 else:
                     raise SyntaxError("Unexpected argument '"+_arg+"'")
         else:
             self.name = s
 
+#Matches file names with attributes, e.g. name[file_type=vhdlSource]
+_FILE_ATTRS = re.compile(r'([^\[]*)\[([^\[]*)\]$')
+
+#All files of the same type share the same file_type string
+_FILE_TYPES = dict((t, t) for t in File.FILE_TYPES)
+
 class Error(Exception):
     pass
 
@@ -123,37 +133,47 @@ class SourceType(str):
             raise ValueError("Invalid value '" + str(arg) + "'. Allowed values are '" + "', '".join(values)+"'")
         return str
 
+#Each section class lists its options in MEMBERS as (name, type, description)
+#tuples. The options of all base classes are merged into _members and _types
+#once for every class when SECTION_MAP is built
+def _slots(members, extra=[]):
+    return [m[0] for m in members] + extra
+
 class Section(object):
 
     TAG = None
     named = False
+    MEMBERS = []
+    __slots__ = ['export_files', 'warnings']
+
+    _members = {}
+    _types = {}
+
     def __init__(self):
-        self._members = {}
         self.export_files = []
         self.warnings = []
-
-    def _add_member(self, name, _type, desc):
-        self._members[name] = {'type' : _type, 'desc' : desc}
-        setattr(self, name, _type())
+        for (name, _type) in self._types.items():
+            setattr(self, name, _type())
 
     def export(self):
         return self.export_files
 
     def load_dict(self, items):
-        for item in items:
-            if item in self._members:
-                _type = self._members.get(item)['type']
-                try:
-                    setattr(self, item, _type(items.get(item)))
-                except ValueError as e:
-                    _s = "Invalid value '{}'. Allowed values are '{}'"
-                    pr_warn(_s.format(', '.join(e.args[1]),
-                                      ', '.join(e.args[2])))
-                    setattr(self, item, _type(e.args[0]))
-            else:
+        types = self._types
+        for (item, value) in items.items():
+            _type = types.get(item)
+            if _type is None:
                 self.warnings.append(
                         'Unknown item "%(item)s" in section "%(section)s"' % {
                             'item': item, 'section': self.TAG})
+                continue
+            try:
+                setattr(self, item, _type(value))
+            except ValueError as e:
+                _s = "Invalid value '{}'. Allowed values are '{}'"
+                pr_warn(_s.format(', '.join(e.args[1]),
+                                  ', '.join(e.args[2])))
+                setattr(self, item, _type(e.args[0]))
 
     def __str__(self):
         s = ''
@@ -166,22 +186,26 @@ class Section(object):
 
 class ScriptsSection(Section):
     TAG = 'scripts'
+    MEMBERS = [
+        ('pre_synth_scripts', StringList, 'Scripts to run before backend synthesis'),
+        ('post_impl_scripts', StringList, 'Scripts to run after backend implementation'),
+        ('pre_run_scripts'  , StringList, 'Scripts to run before running simulations'),
+        ('pre_build_scripts', StringList, 'Scripts to run before building'),
+        ('post_run_scripts' , StringList, 'Scripts to run after simulations'),
+    ]
+    __slots__ = _slots(MEMBERS)
+
     def __init__(self, items=None):
         super(ScriptsSection, self).__init__()
-        self._add_member('pre_synth_scripts', StringList, 'Scripts to run before backend synthesis')
-        self._add_member('post_impl_scripts', StringList, 'Scripts to run after backend implementation')
-        self._add_member('pre_run_scripts'  , StringList, 'Scripts to run before running simulations')
-        self._add_member('pre_build_scripts', StringList, 'Scripts to run before building')
-        self._add_member('pre_run_scripts'  , StringList, 'Scripts to run before running simulations')
-        self._add_member('post_run_scripts' , StringList, 'Scripts to run after simulations')
-
         if items:
             self.load_dict(items)
 
 class ToolSection(Section):
-    def __init__(self):
-        super(ToolSection, self).__init__()
-        self._add_member('depend', VlnvList, "Tool-specific Dependencies")
+    MEMBERS = [
+        ('depend', VlnvList, "Tool-specific Dependencies"),
+    ]
+    __slots__ = _slots(MEMBERS)
+
     def __str__(self):
         s = ""
         if self.depend:
@@ -192,30 +216,34 @@ class ToolSection(Section):
 
 class MainSection(Section):
     TAG = 'main'
+    MEMBERS = [
+        ('name'       , str     , "Component name"),
+        ('backend'    , str     , "Backend for FPGA implementation"),
+        ('component'  , PathList, "Core IP-Xact component file"),
+        ('description', str, "Core description"),
+        ('depend'     , VlnvList, "Common dependencies"),
+        ('simulators' , SimulatorList, "Supported simulators. Valid values are icarus, modelsim, verilator, isim and xsim. Each simulator have a dedicated section desribed elsewhere in this document"),
+        ('patches'    , StringList, "FuseSoC-specific patches"),
+    ]
+    __slots__ = _slots(MEMBERS)
 
     def __init__(self, items=None):
         super(MainSection, self).__init__()
 
-        self._add_member('name'       , str     , "Component name")
-        self._add_member('backend'    , str     , "Backend for FPGA implementation")
-        self._add_member('component'  , PathList, "Core IP-Xact component file")
-        self._add_member('description', str, "Core description")
-        self._add_member('depend'     , VlnvList, "Common dependencies")
-        self._add_member('simulators' , SimulatorList, "Supported simulators. Valid values are icarus, modelsim, verilator, isim and xsim. Each simulator have a dedicated section desribed elsewhere in this document")
-        self._add_member('patches'    , StringList, "FuseSoC-specific patches")
-
         if items:
             self.load_dict(items)
 
 class VhdlSection(Section):
 
     TAG = 'vhdl'
+    MEMBERS = [
+        ('src_files', PathList, "VHDL source files for simulation and synthesis"),
+    ]
+    __slots__ = _slots(MEMBERS)
 
     def __init__(self, items=None):
         super(VhdlSection, self).__init__()
 
-        self._add_member('src_files', PathList, "VHDL source files for simulation and synthesis")
-
         if items:
             self.load_dict(items)
             self.export_files = self.src_files
@@ -223,6 +251,15 @@ class VhdlSection(Section):
 class VerilogSection(Section):
 
     TAG = 'verilog'
+    MEMBERS = [
+        ('src_files'           , FileList, "Verilog source files for synthesis/simulation"),
+        ('include_files'       , FileList, "Verilog include files"),
+        ('tb_src_files'        , FileList, "Verilog source files that are only used in simulation. Visible to other cores"),
+        ('tb_private_src_files', FileList, "Verilog source files that are only used in the core's own testbench. Not visible to other cores"),
+        ('tb_include_files'    , FileList, "Testbench include files"),
+        ('file_type'           , str     , "Default file type of the files in fileset"),
+    ]
+    __slots__ = _slots(MEMBERS, ['include_dirs', 'tb_include_dirs'])
 
     def __init__(self, items=None):
         super(VerilogSection, self).__init__()
@@ -230,13 +267,6 @@ class VerilogSection(Section):
         self.include_dirs = []
         self.tb_include_dirs = []
 
-        self._add_member('src_files'           , FileList, "Verilog source files for synthesis/simulation")
-        self._add_member('include_files'       , FileList, "Verilog include files")
-        self._add_member('tb_src_files'        , FileList, "Verilog source files that are only used in simulation. Visible to other cores")
-        self._add_member('tb_private_src_files', FileList, "Verilog source files that are only used in the core's own testbench. Not visible to other cores")
-        self._add_member('tb_include_files'    , FileList, "Testbench include files")
-        self._add_member('file_type'           , str     , "Default file type of the files in fileset")
-
         if items:
             self.load_dict(items)
             if not self.file_type:
@@ -251,15 +281,19 @@ class VerilogSection(Section):
 class FileSetSection(Section):
     TAG = 'fileset'
     named = True
+    MEMBERS = [
+        ('files'          , FileList, "List of files in fileset"),
+        ('file_type'      , str     , "Default file type of the files in fileset"),
+        ('is_include_file', str     , "Specify all files in fileset as include files"),
+        ('logical_name'   , str     , "Default logical_name (e.g. library) of the files in fileset"),
+        ('scope'          , str     , "Visibility of fileset (private/public). Private filesets are only visible when this core is the top-level. Public filesets are visible also for cores that depend on this core. Default is public"),
+        ('usage'          , StringList, "List of tags describing when this fileset should be used. Can be general such as sim or synth, or tool-specific such as quartus, verilator, icarus. Defaults to 'sim synth'."),
+    ]
+    __slots__ = _slots(MEMBERS)
+
     def __init__(self, items=None):
         super(FileSetSection, self).__init__()
 
-        self._add_member('files'          , FileList, "List of files in fileset")
-        self._add_member('file_type'      , str     , "Default file type of the files in fileset")
-        self._add_member('is_include_file', str     , "Specify all files in fileset as include files")
-        self._add_member('logical_name'   , str     , "Default logical_name (e.g. library) of the files in fileset")
-        self._add_member('scope'          , str     , "Visibility of fileset (private/public). Private filesets are only visible when this core is the top-level. Public filesets are visible also for cores that depend on this core. Default is public")
-        self._add_member('usage'          , StringList, "List of tags describing when this fileset should be used. Can be general such as sim or synth, or tool-specific such as quartus, verilator, icarus. Defaults to 'sim synth'.")
         if items:
             self.load_dict(items)
             if not self.scope:
@@ -279,16 +313,18 @@ class FileSetSection(Section):
 class VpiSection(Section):
 
     TAG = 'vpi'
+    MEMBERS = [
+        ('src_files'    , FileList, "C source files for VPI library"),
+        ('include_files', FileList, "C include files for VPI library"),
+        ('libs'         , StringList, "External libraries linked with the VPI library"),
+    ]
+    __slots__ = _slots(MEMBERS, ['include_dirs'])
 
     def __init__(self, items=None):
         super(VpiSection, self).__init__()
 
         self.include_dirs = []
 
-        self._add_member('src_files'    , FileList, "C source files for VPI library")
-        self._add_member('include_files', FileList, "C include files for VPI library")
-        self._add_member('libs'         , StringList, "External libraries linked with the VPI library")
-
         if items:
             self.load_dict(items)
             if self.include_files:
@@ -300,38 +336,44 @@ class VpiSection(Section):
 class ModelsimSection(ToolSection):
 
     TAG = 'modelsim'
+    MEMBERS = [
+        ('vlog_options', StringList, "Additional arguments for vlog"),
+        ('vsim_options', StringList, "Additional arguments for vsim"),
+    ]
+    __slots__ = _slots(MEMBERS)
 
     def __init__(self, items=None):
         super(ModelsimSection, self).__init__()
 
-        self._add_member('vlog_options', StringList, "Additional arguments for vlog")
-        self._add_member('vsim_options', StringList, "Additional arguments for vsim")
-
         if items:
             self.load_dict(items)
 
 class RivieraproSection(ToolSection):
 
     TAG = 'rivierapro'
+    MEMBERS = [
+        ('vlog_options', StringList, "Additional arguments for vlog"),
+        ('vsim_options', StringList, "Additional arguments for vsim"),
+    ]
+    __slots__ = _slots(MEMBERS)
 
     def __init__(self, items=None):
         super(RivieraproSection, self).__init__()
 
-        self._add_member('vlog_options', StringList, "Additional arguments for vlog")
-        self._add_member('vsim_options', StringList, "Additional arguments for vsim")
-
         if items:
             self.load_dict(items)
 
 class GhdlSection(ToolSection):
     TAG = 'ghdl'
+    MEMBERS = [
+        ('analyze_options', StringList, "Extra GHDL analyzer options"),
+        ('run_options', StringList, "Extra GHDL run options"),
+    ]
+    __slots__ = _slots(MEMBERS)
 
     def __init__(self, items=None):
         super(GhdlSection, self).__init__()
 
-        self._add_member('analyze_options', StringList, "Extra GHDL analyzer options")
-        self._add_member('run_options', StringList, "Extra GHDL run options")
-
         if items:
             self.load_dict(items)
 
@@ -344,12 +386,14 @@ class GhdlSection(ToolSection):
 class IcarusSection(ToolSection):
 
     TAG = 'icarus'
+    MEMBERS = [
+        ('iverilog_options', StringList, "Extra Icarus verilog compile options"),
+    ]
+    __slots__ = _slots(MEMBERS)
 
     def __init__(self, items=None):
         super(IcarusSection, self).__init__()
 
-        self._add_member('iverilog_options', StringList, "Extra Icarus verilog compile options")
-
         if items:
             self.load_dict(items)
 
@@ -362,12 +406,14 @@ class IcarusSection(ToolSection):
 class IsimSection(ToolSection):
 
     TAG = 'isim'
+    MEMBERS = [
+        ('isim_options', StringList, "Extra Isim compile options"),
+    ]
+    __slots__ = _slots(MEMBERS)
 
     def __init__(self, items=None):
         super(IsimSection, self).__init__()
 
-        self._add_member('isim_options', StringList, "Extra Isim compile options")
-
         if items:
             self.load_dict(items)
 
@@ -380,12 +426,14 @@ class IsimSection(ToolSection):
 class XsimSection(ToolSection):
 
     TAG = 'xsim'
+    MEMBERS = [
+        ('xsim_options', StringList, "Extra Xsim compile options"),
+    ]
+    __slots__ = _slots(MEMBERS)
 
     def __init__(self, items=None):
         super(XsimSection, self).__init__()
 
-        self._add_member('xsim_options', StringList, "Extra Xsim compile options")
-
         if items:
             self.load_dict(items)
 
@@ -397,23 +445,24 @@ class XsimSection(ToolSection):
 class VerilatorSection(ToolSection):
 
     TAG = 'verilator'
+    MEMBERS = [
+        ('verilator_options', StringList, "Verilator build options"),
+        ('src_files'        , FileList  , "Verilator testbench C/cpp/sysC source files"),
+        ('include_files'    , FileList  , "Verilator testbench C include files"),
+        ('define_files'     , PathList  , "Verilog include files containing `define directives to be converted to C #define directives in corresponding .h files"),
+        ('libs'             , PathList  , "External libraries linked with the generated model"),
+        ('tb_toplevel', FileList, 'Testbench top-level C/C++/SC file'),
+        ('source_type', str, 'Testbench source code language (Legal values are systemC, C, CPP. Default is C)'),
+        ('top_module' , str, 'verilog top-level module'),
+        ('cli_parser' , str, "Select CLI argument parser. Set to 'fusesoc' to handle parameter sections like other simulators. Set to 'passthrough' to send the arguments directly to the verilated model. Default is 'passthrough'"),
+    ]
+    __slots__ = _slots(MEMBERS, ['include_dirs'])
 
     def __init__(self, items=None):
         super(VerilatorSection, self).__init__()
 
         self.include_dirs = []
 
-        self._add_member('verilator_options', StringList, "Verilator build options")
-        self._add_member('src_files'        , FileList  , "Verilator testbench C/cpp/sysC source files")
-        self._add_member('include_files'    , FileList  , "Verilator testbench C include files")
-        self._add_member('define_files'     , PathList  , "Verilog include files containing `define directives to be converted to C #define directives in corresponding .h files")
-        self._add_member('libs'             , PathList  , "External libraries linked with the generated model")
-
-        self._add_member('tb_toplevel', FileList, 'Testbench top-level C/C++/SC file')
-        self._add_member('source_type', str, 'Testbench source code language (Legal values are systemC, C, CPP. Default is C)')
-        self._add_member('top_module' , str, 'verilog top-level module')
-        self._add_member('cli_parser' , str, "Select CLI argument parser. Set to 'fusesoc' to handle parameter sections like other simulators. Set to 'passthrough' to send the arguments directly to the verilated model. Default is 'passthrough'")
-
         if items:
             self.load_dict(items)
             self.include_dirs  = unique_dirs(self.include_files)
@@ -441,65 +490,72 @@ Verilog top module      : {top_module}
 class IcestormSection(ToolSection):
 
     TAG = 'icestorm'
+    MEMBERS = [
+        ('arachne_pnr_options', StringList, "arachne-pnr options"),
+        ('pcf_file' , FileList, "Physical constraint file"),
+        ('top_module', str, 'RTL top-level module'),
+    ]
+    __slots__ = _slots(MEMBERS)
 
     def __init__(self, items=None):
         super(IcestormSection, self).__init__()
 
-        self._add_member('arachne_pnr_options', StringList, "arachne-pnr options")
-        self._add_member('pcf_file' , FileList, "Physical constraint file")
-        self._add_member('top_module', str, 'RTL top-level module')
-
         if items:
             self.load_dict(items)
 
 class VivadoSection(ToolSection):
 
     TAG = 'vivado'
+    MEMBERS = [
+        ('part'       , str, 'FPGA device part'),
+        ('hw_device'  , str, 'FPGA device identifier'),
+        ('top_module' , str, 'RTL top-level module'),
+    ]
+    __slots__ = _slots(MEMBERS)
 
     def __init__(self, items=None):
         super(VivadoSection, self).__init__()
 
-        self._add_member('part'       , str, 'FPGA device part')
-        self._add_member('hw_device'  , str, 'FPGA device identifier')
-        self._add_member('top_module' , str, 'RTL top-level module')
-
         if items:
             self.load_dict(items)
 
 class IseSection(ToolSection):
 
     TAG = 'ise'
+    MEMBERS = [
+        ('ucf_files' , FileList, "UCF constraint files"),
+        ('tcl_files' , FileList, "Extra TCL scripts"),
+        ('family'    , str, 'FPGA device family'),
+        ('device'    , str, 'FPGA device identifier'),
+        ('package'   , str, 'FPGA device package'),
+        ('speed'     , str, 'FPGA device speed grade'),
+        ('top_module', str, 'RTL top-level module'),
+    ]
+    __slots__ = _slots(MEMBERS)
 
     def __init__(self, items=None):
         super(IseSection, self).__init__()
 
-        self._add_member('ucf_files' , FileList, "UCF constraint files")
-        self._add_member('tcl_files' , FileList, "Extra TCL scripts")
-        self._add_member('family'    , str, 'FPGA device family')
-        self._add_member('device'    , str, 'FPGA device identifier')
-        self._add_member('package'   , str, 'FPGA device package')
-        self._add_member('speed'     , str, 'FPGA device speed grade')
-        self._add_member('top_module', str, 'RTL top-level module')
-
         if items:
             self.load_dict(items)
 
 class QuartusSection(ToolSection):
 
     TAG = 'quartus'
+    MEMBERS = [
+        ('qsys_files', FileList, "Qsys IP description files"),
+        ('sdc_files' , FileList, "SDC constraint files"),
+        ('tcl_files' , FileList, "Extra script files"),
+        ('quartus_options', str, 'Quartus command-line options'),
+        ('family'         , str, 'FPGA device family'),
+        ('device'         , str, 'FPGA device identifier'),
+        ('top_module'     , str, 'RTL top-level module'),
+    ]
+    __slots__ = _slots(MEMBERS)
 
     def __init__(self, items=None):
         super(QuartusSection, self).__init__()
 
-        self._add_member('qsys_files', FileList, "Qsys IP description files")
-        self._add_member('sdc_files' , FileList, "SDC constraint files")
-        self._add_member('tcl_files' , FileList, "Extra script files")
-
-        self._add_member('quartus_options', str, 'Quartus command-line options')
-        self._add_member('family'         , str, 'FPGA device family')
-        self._add_member('device'         , str, 'FPGA device identifier')
-        self._add_member('top_module'     , str, 'RTL top-level module')
-
         self.top_module = 'orpsoc_top'
         if items:
             self.load_dict(items)
@@ -513,15 +569,18 @@ class QuartusSection(ToolSection):
 class ParameterSection(Section):
     TAG = 'parameter'
     named = True
+    MEMBERS = [
+        ('datatype'   , str, 'Data type of argument (int, str, bool, file'),
+        ('default'    , str, 'Default value of argument'),
+        ('description', str, 'Parameter description'),
+        ('paramtype'  , str, 'Type of parameter (plusarg, vlogparam, generic, cmdlinearg'),
+        ('scope'      , str, 'Visibility of parameter. Private parameters are only visible when this core is the top-level. Public parameters are visible also when this core is pulled in as a dependency of another core'),
+    ]
+    __slots__ = _slots(MEMBERS)
+
     def __init__(self, items=None):
         super(ParameterSection, self).__init__()
 
-        self._add_member('datatype'   , str, 'Data type of argument (int, str, bool, file')
-        self._add_member('default'    , str, 'Default value of argument')
-        self._add_member('description', str, 'Parameter description')
-        self._add_member('paramtype'  , str, 'Type of parameter (plusarg, vlogparam, generic, cmdlinearg')
-        self._add_member('scope'      , str, 'Visibility of parameter. Private parameters are only visible when this core is the top-level. Public parameters are visible also when this core is pulled in as a dependency of another core')
-
         if items:
             self.load_dict(items)
     def __str__(self):
@@ -569,6 +628,13 @@ SECTION_MAP = {}
 
 def _register_subclasses(parent):
     for cls in parent.__subclasses__():
+        members = OrderedDict()
+        for base in reversed(cls.__mro__):
+            for (name, _type, desc) in base.__dict__.get('MEMBERS', []):
+                members[name] = {'type' : _type, 'desc' : desc}
+        cls._members = members
+        cls._types = OrderedDict((k, v['type']) for (k, v) in members.items())
+
         _register_subclasses(cls)
         if cls.TAG is None:
             continue
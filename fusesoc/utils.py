@@ -1,11 +1,24 @@
+import contextlib
+import os
 import subprocess
 import re
 import sys
+import tempfile
 from fusesoc.config import Config
 
 if sys.version[0] == '2':
     FileNotFoundError = OSError
 
+try:
+    replace_file = os.replace
+except AttributeError:
+    replace_file = os.rename
+
+try:
+    from sys import intern
+except ImportError:
+    pass
+
 from fusesoc.config import Config
 
 class Launcher:
@@ -157,5 +170,43 @@ def pr_info(msg):
     else:
         print('\033[1;37m' + 'INFO:  ' + msg + '\033[0m')
 
+#Share one copy of strings that are repeated for many objects, such as file
+#types. Python 2 can only intern byte strings, so unicode is returned as is
+def intern_str(s):
+    try:
+        return intern(s)
+    except TypeError:
+        return s
+
 def unique_dirs(file_list):
     return list(set([os.path.dirname(f.name) for f in file_list]))
+
+#mkstemp creates files that only the owner can read. Files written with
+#atomic_open get the usual permissions instead. The umask can only be read by
+#changing it, which is done once here before any threads are started
+_umask = os.umask(0)
+os.umask(_umask)
+
+#Write to a temporary file which is renamed to path once it has been written
+#successfully. Readers will never see a partially written file. Each writer
+#gets its own temporary file, also when several threads write the same path
+@contextlib.contextmanager
+def atomic_open(path, mode='w'):
+    dirname = os.path.dirname(path)
+    if dirname and not os.path.exists(dirname):
+        try:
+            os.makedirs(dirname)
+        except OSError:
+            if not os.path.isdir(dirname):
+                raise
+    (fd, tmp_path) = tempfile.mkstemp(dir=dirname or '.',
+                                      prefix=os.path.basename(path) + '.tmp')
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.chmod(tmp_path, 0o666 & ~_umask)
+        replace_file(tmp_path, path)
+    except:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
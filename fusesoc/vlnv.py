@@ -1,102 +1,188 @@
+import re
+
+_version_part = re.compile(r'\d+|[^\d\W_]+')
+
+#Vlnv objects are immutable and interned. Parsing the same string again
+#returns the object from the first time it was parsed
+_cache = {}
+
+def _unpickle(args, relation):
+    return Vlnv(*args).with_relation(relation)
+
+#Comparable key for a version string. Numeric parts are compared as numbers.
+#Text parts sort before the end of the version, and the end before numeric
+#parts, so that e.g. 1.10 > 1.9.1 > 1.9 > 1.9rc1
+def version_key(version):
+    key = []
+    for part in _version_part.findall(version):
+        if part.isdigit():
+            key.append((2, int(part), ''))
+        else:
+            key.append((0, 0, part))
+    key.append((1, 0, ''))
+    return tuple(key)
+
 class Vlnv(object):
+    __slots__ = ['conflict', 'relation', 'vendor', 'library', 'name',
+                 'version', 'revision', 'sanitized_name', 'version_key',
+                 '_str', '_args']
+
+    def __new__(cls, s, default_relation = ">="):
+        key = (s, default_relation)
+        vlnv = _cache.get(key)
+        if vlnv is None:
+            vlnv = super(Vlnv, cls).__new__(cls)
+            vlnv._parse(s, default_relation)
+            _cache[key] = vlnv
+        return vlnv
+
     def __init__(self, s, default_relation = ">="):
+        pass
+
+    def _parse(self, s, default_relation):
         def _is_rev(s):
             return s.startswith('r') and s[1:].isdigit()
         def _is_version(s):
             return s[0].isdigit()
 
         if s.startswith('!'):
-            self.conflict = True
+            conflict = True
             _s = s[1:]
         else:
-            self.conflict = False
+            conflict = False
             _s = s[:]
         if _s[0:2] in ['>=', '<=']:
-            self.relation = _s[0:2]
+            relation = _s[0:2]
             _s = _s[2:]
         elif s[0] in ['>', '<']:
-            self.relation = s[0]
+            relation = s[0]
             _s = _s[1:]
         elif s[0] in ['=']:
-            self.relation = "=="
+            relation = "=="
             _s = _s[1:]
         else:
-            self.relation = ""
+            relation = ""
 
         vlnv_parts = _s.split(':')
 
-        self.revision = 0
+        revision = 0
         #legacy naming. Only name
         if len(vlnv_parts) == 1:
-            self.vendor  = ""
-            self.library = ""
+            vendor  = ""
+            library = ""
             sl = vlnv_parts[0].rsplit('-')
             if len(sl) == 1:
                 #Simplest case. No '-' => Only name
-                self.name = s
-                self.version = ""
+                name = s
+                version = ""
             else:
                 #If last part is the revision, save and pop from list
                 if _is_rev(sl[-1]):
-                    self.revision = int(sl.pop()[1:])
+                    revision = int(sl.pop()[1:])
 
                 #If last part is version, save and pop from list
                 if len(sl) > 1 and _is_version(sl[-1]):
-                    self.version = sl.pop()
+                    version = sl.pop()
                 else:
-                    self.version = ""
+                    version = ""
 
-                self.name    = '-'.join(sl)
+                name    = '-'.join(sl)
 
         #No version tag
         elif len(vlnv_parts) == 3:
-            self.vendor  = vlnv_parts[0]
-            self.library = vlnv_parts[1]
-            self.name    = vlnv_parts[2]
-            self.version = ""
+            vendor  = vlnv_parts[0]
+            library = vlnv_parts[1]
+            name    = vlnv_parts[2]
+            version = ""
         #Full vlnv
         elif len(vlnv_parts) == 4:
-            self.vendor  = vlnv_parts[0]
-            self.library = vlnv_parts[1]
-            self.name    = vlnv_parts[2]
-            self.version = vlnv_parts[3]
+            vendor  = vlnv_parts[0]
+            library = vlnv_parts[1]
+            name    = vlnv_parts[2]
+            version = vlnv_parts[3]
         else:
-            raise SyntaxError("Illegal core name '{}'".format(s)) 
+            raise SyntaxError("Illegal core name '{}'".format(s))
 
-        if self.version or (self.revision > 0):
-            if not self.relation:
+        if version or (revision > 0):
+            if not relation:
                 # Version specified without relational operator
                 # Assume user wants the exact version
-                self.relation = "=="
-            if not self.version:
-                self.version = "0"
+                relation = "=="
+            if not version:
+                version = "0"
         else:
-            if self.relation:
+            if relation:
                 _s = "{}: '{}' operator requires a version "
-                raise SyntaxError(_s.format(s, self.relation))
+                raise SyntaxError(_s.format(s, relation))
             #No version specifier means any version i.e. >=0
-            self.version = "0"
-            self.relation = default_relation
+            version = "0"
+            relation = default_relation
 
+        if revision > 0:
+            _str = "{}:{}:{}:{}-r{}".format(vendor, library, name, version, revision)
+        else:
+            _str = "{}:{}:{}:{}".format(vendor, library, name, version)
+
+        _set = super(Vlnv, self).__setattr__
+        _set('conflict', conflict)
+        _set('relation', relation)
+        _set('vendor'  , vendor)
+        _set('library' , library)
+        _set('name'    , name)
+        _set('version' , version)
+        _set('revision', revision)
+        _set('_str'    , _str)
+        _set('_args'   , (s, default_relation))
         #Create sanitized name
-        self.sanitized_name = str(self).lstrip(':').replace(":", "_")
+        _set('sanitized_name', _str.lstrip(':').replace(":", "_"))
+        _set('version_key'   , (version_key(version), revision))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Vlnv objects are immutable")
+
+    def __reduce__(self):
+        return (_unpickle, (self._args, self.relation))
+
+    #Returns the same VLNV with another relational operator
+    def with_relation(self, relation):
+        if relation == self.relation:
+            return self
+        key = self._args + (relation,)
+        vlnv = _cache.get(key)
+        if vlnv is None:
+            vlnv = super(Vlnv, Vlnv).__new__(Vlnv)
+            _set = super(Vlnv, vlnv).__setattr__
+            for attr in self.__slots__:
+                _set(attr, getattr(self, attr))
+            _set('relation', relation)
+            _cache[key] = vlnv
+        return vlnv
+
+    #Two VLNVs are equal if they identify the same core, regardless of the
+    #relational operator
+    def __eq__(self, other):
+        if not isinstance(other, Vlnv):
+            return NotImplemented
+        return self._str == other._str
+
+    def __ne__(self, other):
+        if not isinstance(other, Vlnv):
+            return NotImplemented
+        return self._str != other._str
+
+    def __hash__(self):
+        return hash(self._str)
+
+    def __lt__(self, other):
+        return (self.vendor, self.library, self.name, self.version_key) < \
+            (other.vendor, other.library, other.name, other.version_key)
 
     def __str__(self):
-        if self.relation == '=':
-            relation = ""
-        else:
-            relation = self.relation
-        if self.revision > 0:
-            revision = "-r"+str(self.revision)
-        else:
-            revision = ""
-#        return "{}{}:{}:{}:{}{}".format(relation,
-        return "{}{}:{}:{}:{}{}".format("",
-                                        self.vendor,
-                                        self.library,
-                                        self.name,
-                                        self.version,
-                                        revision)
+        return self._str
+
+    def __repr__(self):
+        return "Vlnv('{}')".format(self.depstr())
+
     def depstr(self):
         if self.relation == '==':
             relation = ""
@@ -0,0 +1,262 @@
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import logging
+import os
+import select
+import struct
+import sys
+import time
+
+from fusesoc.config import Config
+from fusesoc.coreindex import file_stamp, system_file
+from fusesoc.utils import atomic_open, pr_info
+
+logger = logging.getLogger(__name__)
+
+#The list of cores written by a watcher is only trusted if the watcher has
+#touched its state file within this many polling intervals
+HEARTBEAT_TIMEOUT = 3
+
+#Time to wait for more events after a change before rescanning
+SETTLE_TIME = 0.1
+
+#From <sys/inotify.h>
+IN_MODIFY      = 0x00000002
+IN_ATTRIB      = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM  = 0x00000040
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_DELETE      = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF   = 0x00000800
+IN_Q_OVERFLOW  = 0x00004000
+IN_IGNORED     = 0x00008000
+IN_ONLYDIR     = 0x01000000
+IN_CLOEXEC     = 0o2000000
+
+_EVENT = struct.Struct('iIII')
+
+def _state_file(root):
+    name = hashlib.sha1(root.encode('utf-8')).hexdigest()
+    return os.path.join(Config().cache_root, 'watch', name+'.json')
+
+def watched_core_files(root):
+    state_file = _state_file(root)
+    try:
+        age = time.time() - os.path.getmtime(state_file)
+        with open(state_file) as f:
+            state = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if state.get('root') != root:
+        return None
+    if age > HEARTBEAT_TIMEOUT * state['interval']:
+        logger.debug("Ignoring stale library watcher state for " + root)
+        return None
+    return state['files']
+
+class _Inotify(object):
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+            IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF |
+            IN_MOVE_SELF | IN_ONLYDIR)
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._wds = {}
+        self._paths = set()
+
+    def watch(self, path):
+        if path in self._paths:
+            return
+        wd = self._add_watch(self.fd, path.encode(sys.getfilesystemencoding()), self.MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            logger.warning("Failed to watch {}: {}".format(path, os.strerror(err)))
+            return
+        self._wds[wd] = path
+        self._paths.add(path)
+
+    #Returns the directories where something has changed, or None if the
+    #kernel dropped events and everything has to be rescanned
+    def wait(self, timeout):
+        (ready, _, _) = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 65536)
+        changed = []
+        overflow = False
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            (wd, mask, cookie, length) = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            path = self._wds.get(wd)
+            if path is None:
+                continue
+            changed.append(path)
+            if mask & IN_IGNORED:
+                #The directory is gone. It will be watched again if it reappears
+                del self._wds[wd]
+                self._paths.discard(path)
+        if overflow:
+            return None
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+class _Poller(object):
+    def watch(self, path):
+        pass
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        return None
+
+    def close(self):
+        pass
+
+#Keeps the core database of a CoreManager in sync with the .core and .system
+#files in a set of core libraries. The list of core files in each library is
+#published in cache_root so that other FuseSoC processes can skip walking the
+#libraries, and changed cores are written to the core index
+class LibraryWatcher(object):
+    def __init__(self, cm, roots, interval=2.0, polling=False):
+        self.cm = cm
+        self.roots = roots
+        self.interval = interval
+
+        self.files  = {}
+        self.stamps = {}
+        self.cores  = {}
+
+        self._backend = None
+        if not polling:
+            try:
+                self._backend = _Inotify()
+            except (OSError, AttributeError) as e:
+                pr_info("inotify is not available ({}). Falling back to polling".format(str(e)))
+        if self._backend is None:
+            self._backend = _Poller()
+
+    def _stamp(self, core_file):
+        return (file_stamp(core_file), file_stamp(system_file(core_file)))
+
+    def scan(self, root):
+        visited_dirs = []
+        core_files = self.cm.find_core_files(root, visited_dirs)
+        for d in visited_dirs:
+            self._backend.watch(d)
+
+        old_files = self.files.get(root, [])
+        stamps = dict((f, self._stamp(f)) for f in core_files)
+        changed = [f for f in core_files if self.stamps.get(f) != stamps[f]]
+        removed = set(old_files) - set(core_files)
+        if not changed and not removed and core_files == old_files:
+            return False
+
+        affected = set()
+        for f in removed.union(changed):
+            self.stamps.pop(f, None)
+            core = self.cores.pop(f, None)
+            if core:
+                affected.add(core.name)
+                logger.info("Core file {} was {}".format(f, 'removed' if f in removed else 'modified'))
+
+        cores = self.cm.parse_core_files(changed)
+        for f in changed:
+            #Remember the stamps of broken files too, to avoid repeated warnings
+            self.stamps[f] = stamps[f]
+            if f in cores:
+                self.cores[f] = cores[f]
+                affected.add(cores[f].name)
+
+        self.files[root] = core_files
+        self._update_db(affected)
+        self._write_state(root)
+        return True
+
+    #Re-evaluate which core wins for each of the given names, using the same
+    #order as a full scan of all roots would
+    def _update_db(self, names):
+        winners = {}
+        for root in self.roots:
+            for f in self.files.get(root, []):
+                core = self.cores.get(f)
+                if core and core.name in names:
+                    winners[core.name] = core
+        for name in names:
+            if name in winners:
+                self.cm.db.add(winners[name])
+            else:
+                self.cm.db.remove(name)
+
+    def _write_state(self, root):
+        state = {'root'     : root,
+                 'pid'      : os.getpid(),
+                 'interval' : self.interval,
+                 'files'    : self.files[root]}
+        with atomic_open(_state_file(root)) as f:
+            json.dump(state, f)
+
+    def _heartbeat(self):
+        for root in self.roots:
+            try:
+                os.utime(_state_file(root), None)
+            except OSError:
+                self._write_state(root)
+
+    def _remove_state(self):
+        for root in self.roots:
+            if os.path.exists(_state_file(root)):
+                os.remove(_state_file(root))
+
+    def _wait(self):
+        changed = self._backend.wait(self.interval)
+        if not changed:
+            return changed
+        #Let a burst of changes (e.g. a git checkout) settle first
+        while True:
+            more = self._backend.wait(SETTLE_TIME)
+            if more is None:
+                return None
+            if not more:
+                return changed
+            changed += more
+
+    def run(self):
+        for root in self.roots:
+            self.scan(root)
+        self.cm.save_index()
+        pr_info("Watching " + ', '.join(self.roots))
+        try:
+            while True:
+                changed = self._wait()
+                if changed is None:
+                    dirty = self.roots
+                else:
+                    dirty = [r for r in self.roots
+                             if [d for d in changed if d == r or d.startswith(r + os.sep)]]
+                updated = False
+                for root in dirty:
+                    if self.scan(root):
+                        updated = True
+                if updated:
+                    self.cm.save_index()
+                self._heartbeat()
+        finally:
+            self._remove_state()
+            self._backend.close()
@@ -33,5 +33,6 @@ setup(
           'attrs==16.0.0', #Workaround for broken pip dep handler
           'ipyxact>=0.2.3',
           'simplesat>=0.4.0',
+          'scandir;python_version<"3.5"',
     ],
 )
@@ -0,0 +1,40 @@
+import pytest
+
+from fusesoc.config import Config
+from fusesoc.coremanager import CoreDB, CoreManager
+
+CORE = """CAPI=1
+[main]
+name = {}
+depend = {}
+"""
+
+#A CoreManager with an empty core database and its caches and build
+#directories in tmpdir
+@pytest.fixture
+def cm(tmpdir, monkeypatch):
+    cm = CoreManager()
+    monkeypatch.setattr(CoreManager, 'db', CoreDB())
+    monkeypatch.setattr(cm, '_index', None)
+    monkeypatch.setattr(cm, '_lockfile', None)
+    monkeypatch.setattr(cm, 'tool', '')
+    monkeypatch.setattr(Config(), 'build_root', str(tmpdir.join('build')))
+    monkeypatch.setattr(Config(), 'cache_root', str(tmpdir.join('cache')))
+    return cm
+
+#Writes a minimal core file to path, relative to tmpdir, followed by any
+#extra sections. Returns the path of the core file
+@pytest.fixture
+def write_core(tmpdir):
+    def _write_core(path, name, depend='', extra=''):
+        core_file = tmpdir.join(*path.split('/'))
+        core_file.write(CORE.format(name, depend) + extra, ensure=True)
+        return str(core_file)
+    return _write_core
+
+#Returns the names of cores as strings
+@pytest.fixture
+def names():
+    def _names(cores):
+        return [str(c.name) for c in cores]
+    return _names
@@ -0,0 +1,95 @@
+import hashlib
+import pytest
+
+from fusesoc.blobstore import BlobStore
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def test_blobstore_checksum(tmpdir):
+    data = b"module a; endmodule\n"
+    src = tmpdir.join('remote', 'a.v')
+    src.write_binary(data, ensure=True)
+    url = 'file://' + str(src)
+    checksum = 'sha256:' + _sha256(data)
+    store = BlobStore(str(tmpdir.join('blobs')))
+
+    path = store.get(url, checksum)
+    assert path == store.path(_sha256(data))
+    assert open(path, 'rb').read() == data
+
+    #Stored files are used without downloading them again
+    src.remove()
+    assert store.get(url, checksum) == path
+
+    #Corrupted files are detected and downloaded again
+    src.write_binary(data)
+    with open(path, 'wb') as f:
+        f.write(b"garbage")
+    assert open(store.get(url, checksum), 'rb').read() == data
+
+    #Downloads that don't match the checksum are never stored
+    src.write_binary(b"module b; endmodule\n")
+    with pytest.raises(RuntimeError) as e:
+        store.get(url, 'sha256:' + '0'*64)
+    assert 'Checksum mismatch' in str(e.value)
+    assert sorted(x.basename for x in tmpdir.join('blobs', 'sha256').listdir()) == [_sha256(data)]
+
+    with pytest.raises(RuntimeError):
+        store.get(url, 'md5:1234')
+
+def test_blobstore_etag(tmpdir, monkeypatch):
+    data = b"module a; endmodule\n"
+    src = tmpdir.join('remote', 'a.v')
+    src.write_binary(data, ensure=True)
+    url = 'file://' + str(src)
+    store = BlobStore(str(tmpdir.join('blobs')))
+
+    #file:// has no ETag, so the file could never be found again and is
+    #not stored
+    consumed = []
+    assert store.get(url, consume=lambda f: consumed.append(f.read())) is None
+    assert consumed == [data]
+    assert not tmpdir.join('blobs').check()
+
+    #With an ETag, an unmodified file is used without downloading it again
+    path = store.get(url, 'sha256:' + _sha256(data))
+    store._add_url(url, '"abc"', _sha256(data))
+    src.remove()
+    requests = []
+    def _open(url, headers={}):
+        requests.append(headers)
+        return None
+    monkeypatch.setattr(store, '_open', _open)
+    assert store.get(url) == path
+    assert requests == [{'If-None-Match' : '"abc"'}]
+
+def test_extract_tar(tmpdir, monkeypatch):
+    import tarfile
+    from fusesoc.blobstore import extract_tar
+    from fusesoc.config import Config
+    monkeypatch.setattr(Config(), 'cache_root', str(tmpdir.join('cache')))
+
+    tmpdir.join('repo-1.0', 'rtl', 'a.v').write("module a; endmodule\n", ensure=True)
+    archive = str(tmpdir.join('repo-1.0.tar.gz'))
+    with tarfile.open(archive, 'w:gz') as t:
+        t.add(str(tmpdir.join('repo-1.0')), 'repo-1.0')
+    url = 'file://' + archive
+    checksum = 'sha256:' + _sha256(open(archive, 'rb').read())
+
+    dst = tmpdir.join('cache', 'repo_1.0')
+    extract_tar(url, str(dst), checksum, strip=True)
+    assert dst.join('rtl', 'a.v').read() == "module a; endmodule\n"
+
+    #The stored archive is extracted again without downloading it
+    tmpdir.join('repo-1.0.tar.gz').rename(tmpdir.join('moved.tar.gz'))
+    dst2 = tmpdir.join('cache', 'repo')
+    extract_tar(url, str(dst2), checksum)
+    assert dst2.join('repo-1.0', 'rtl', 'a.v').check()
+
+    #Nothing is left behind when the archive doesn't match the checksum
+    tmpdir.join('moved.tar.gz').rename(tmpdir.join('repo-1.0.tar.gz'))
+    dst3 = tmpdir.join('cache', 'bad')
+    with pytest.raises(RuntimeError):
+        extract_tar(url, str(dst3), 'sha256:' + '0'*64)
+    assert sorted(x.basename for x in tmpdir.join('cache').listdir()) == ['blobs', 'repo', 'repo_1.0']
@@ -93,3 +93,136 @@ def test_simulator():
                             "atlys.core")
     core = Core(filename)
     assert core.simulator['toplevel'] == 'orpsoc_tb'
+
+def test_lazy_load():
+    filename = os.path.join(os.path.dirname(__file__),
+                            __name__,
+                            "atlys.core")
+    core = Core(filename)
+    assert str(core.name) == '::atlys:0'
+    assert len(core.depend) == 13
+    assert str(core.depend[6]) == '::mor1kx:3.1'
+    assert not core._loaded
+
+    assert core.ise.family == 'spartan6'
+    assert core._loaded
+
+def test_lazy_load_parses_once(monkeypatch):
+    import fusesoc.core
+    filename = os.path.join(os.path.dirname(__file__),
+                            __name__,
+                            "atlys.core")
+    parsed = []
+    parser = fusesoc.core.FusesocConfigParser
+    def _parser(config_file):
+        parsed.append(config_file)
+        return parser(config_file)
+    monkeypatch.setattr(fusesoc.core, 'FusesocConfigParser', _parser)
+
+    #Loading the rest of the core reuses the config from the first parse of
+    #the .core and .system files
+    core = Core(filename)
+    assert core.ise.family == 'spartan6'
+    assert sorted(parsed) == [filename, filename.replace('.core', '.system')]
+
+def test_component_pending(tmpdir):
+    core_file = tmpdir.join('remote.core')
+    core_file.write("""CAPI=1
+[main]
+component = remote.xml
+
+[provider]
+name = url
+url = file:///nonexistent/remote.tar.gz
+filetype = tar
+""")
+    core = Core(str(core_file))
+
+    #Loading the core must not try to fetch it
+    assert core.file_sets == []
+    assert core.cache_status() == 'empty (component pending)'
+
+IPXACT_COMPONENT = """<?xml version="1.0" encoding="UTF-8"?>
+<spirit:component xmlns:spirit="http://www.spiritconsortium.org/XMLSchema/SPIRIT/1.5">
+  <spirit:vendor>fusesoc</spirit:vendor>
+  <spirit:library>tests</spirit:library>
+  <spirit:name>ipxact</spirit:name>
+  <spirit:version>1.0</spirit:version>
+  <spirit:fileSets>
+    <spirit:fileSet>
+      <spirit:name>rtl_files</spirit:name>
+      <spirit:file>
+        <spirit:name>defines.v</spirit:name>
+        <spirit:fileType>verilogSource</spirit:fileType>
+        <spirit:isIncludeFile>true</spirit:isIncludeFile>
+      </spirit:file>
+      <spirit:file>
+        <spirit:name>top.vhd</spirit:name>
+        <spirit:fileType>vhdlSource</spirit:fileType>
+        <spirit:logicalName>work</spirit:logicalName>
+      </spirit:file>
+    </spirit:fileSet>
+  </spirit:fileSets>
+  <spirit:description>IP-XACT test component</spirit:description>
+</spirit:component>
+"""
+
+def test_component_cache(tmpdir, monkeypatch):
+    from fusesoc.config import Config
+    from ipyxact.ipyxact import Component
+
+    monkeypatch.setattr(Config(), 'cache_root', str(tmpdir.join('cache')))
+    tmpdir.join('ipxact.xml').write(IPXACT_COMPONENT)
+    core_file = tmpdir.join('ipxact.core')
+    core_file.write("CAPI=1\n[main]\ncomponent = ipxact.xml\n")
+
+    def check(core):
+        assert len(core.file_sets) == 1
+        assert core.main.description == 'IP-XACT test component'
+        fs = core.file_sets[0]
+        assert fs.name == 'rtl_files'
+        assert [f.name for f in fs.file] == ['defines.v', 'top.vhd']
+        assert [f.file_type for f in fs.file] == ['verilogSource', 'vhdlSource']
+        assert [f.is_include_file for f in fs.file] == [True, False]
+        assert fs.file[1].logical_name == 'work'
+
+    check(Core(str(core_file)))
+    assert len(tmpdir.join('cache', 'ipxact').listdir()) == 1
+
+    #The second time around the XML file must not be parsed
+    def fail(self, f):
+        raise AssertionError("Component parsed again")
+    monkeypatch.setattr(Component, 'load', fail)
+    check(Core(str(core_file)))
+
+def test_section_members():
+    from fusesoc.section import SECTION_MAP
+    s = SECTION_MAP['modelsim']({'depend'       : '::a:1.0',
+                                 'vlog_options' : '+a +b',
+                                 'unknown'      : 'x'})
+    assert list(s._members) == ['depend', 'vlog_options', 'vsim_options']
+    assert s.vlog_options == ['+a', '+b']
+    assert s.vsim_options == []
+    assert s.warnings == ['Unknown item "unknown" in section "modelsim"']
+    #Sections are stored in slots
+    assert not hasattr(s, '__dict__')
+
+def test_file_attributes():
+    from fusesoc.section import File, FileList
+    files = FileList('a.v b.vhd[file_type=vhdlSource-2008,logical_name=lib] '
+                     'c.vh[is_include_file] d.vhd[logical_name=lib]')
+    assert [(f.name, f.file_type, f.is_include_file, f.logical_name) for f in files] == \
+        [('a.v'  , ''              , False, ''),
+         ('b.vhd', 'vhdlSource-2008', False, 'lib'),
+         ('c.vh' , ''              , True , ''),
+         ('d.vhd', ''              , False, 'lib')]
+    #Attribute values are shared between files
+    assert files[1].logical_name is files[3].logical_name
+    assert not hasattr(files[0], '__dict__')
+
+    with pytest.raises(SyntaxError):
+        File('a.vhd[file_type=vhdl]')
+    with pytest.raises(SyntaxError):
+        File('a.vhd[b[c]')
+    with pytest.raises(SyntaxError):
+        File('a.vhd[unknown]')
@@ -0,0 +1,80 @@
+import os
+import shutil
+
+from fusesoc.core import Core
+from fusesoc.coreindex import CoreIndex
+
+tests_dir = os.path.dirname(__file__)
+
+def _copy_core(tmpdir, name):
+    src = os.path.join(tests_dir, 'cores', name)
+    dst = str(tmpdir.join('cores', name))
+    shutil.copytree(src, dst)
+    return dst
+
+def test_core_index_roundtrip(tmpdir):
+    core_root = _copy_core(tmpdir, 'wb_common')
+    core_file = os.path.join(core_root, 'wb_common.core')
+    index_file = str(tmpdir.join('cache', 'core_index'))
+
+    index = CoreIndex(index_file)
+    assert index.get(core_file) is None
+    index.add(core_file, Core(core_file))
+    index.save()
+    assert os.path.exists(index_file)
+
+    core = CoreIndex(index_file).get(core_file)
+    assert str(core.name) == '::wb_common:0'
+    assert core.core_root == core_root
+
+def test_core_index_modified(tmpdir):
+    core_root = _copy_core(tmpdir, 'wb_common')
+    core_file = os.path.join(core_root, 'wb_common.core')
+    index_file = str(tmpdir.join('cache', 'core_index'))
+
+    index = CoreIndex(index_file)
+    index.add(core_file, Core(core_file))
+    index.save()
+
+    with open(core_file, 'a') as f:
+        f.write('\n')
+    assert CoreIndex(index_file).get(core_file) is None
+
+def test_core_index_corrupt(tmpdir):
+    index_file = tmpdir.join('core_index')
+    index_file.write('garbage')
+    index = CoreIndex(str(index_file))
+    assert index.get('/nonexistent.core') is None
+
+def test_core_index_prune(tmpdir):
+    core_files = [os.path.join(_copy_core(tmpdir, name), name + '.core')
+                  for name in ['wb_common', 'gpio']]
+    index_file = str(tmpdir.join('cache', 'core_index'))
+
+    index = CoreIndex(index_file)
+    for core_file in core_files:
+        index.add(core_file, Core(core_file))
+    index.save()
+
+    #Cores that are no longer found are dropped from the index
+    index = CoreIndex(index_file)
+    assert index.get(core_files[0])
+    index.save()
+    index = CoreIndex(index_file)
+    assert index.get(core_files[0])
+    assert index.get(core_files[1]) is None
+
+def test_core_index_environment(tmpdir, monkeypatch):
+    core_file = tmpdir.join('env', 'env.core')
+    core_file.write("CAPI=1\n[main]\ncomponent = $COMPONENT_DIR/env.xml\n", ensure=True)
+    index_file = str(tmpdir.join('cache', 'core_index'))
+    monkeypatch.setenv('COMPONENT_DIR', 'first')
+
+    index = CoreIndex(index_file)
+    index.add(str(core_file), Core(str(core_file)))
+    index.save()
+
+    #Environment variables are expanded when the core is loaded from the index
+    monkeypatch.setenv('COMPONENT_DIR', 'second')
+    core = CoreIndex(index_file).get(str(core_file))
+    assert core.main.component == ['second/env.xml']
@@ -0,0 +1,356 @@
+import json
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import pytest
+
+from fusesoc.config import Config
+from fusesoc.coreindex import read_manifest
+from fusesoc.coremanager import CoreDB, CoreManager, DependencyError
+from fusesoc.vlnv import Vlnv
+
+tests_dir = os.path.dirname(__file__)
+cores_root = os.path.join(tests_dir, 'cores')
+
+def test_load_cores_parallel(cm, monkeypatch, names):
+    monkeypatch.setattr(Config(), 'scan_jobs', 1)
+    cm.load_cores(cores_root)
+    serial = sorted(names(cm.db.find()))
+
+    monkeypatch.setattr(CoreManager, 'db', CoreDB())
+    monkeypatch.setattr(cm, '_index', None)
+    monkeypatch.setattr(Config(), 'cache_root', Config().cache_root + '2')
+    monkeypatch.setattr(Config(), 'scan_jobs', 4)
+    cm.load_cores(cores_root)
+
+    assert sorted(names(cm.db.find())) == serial
+    assert '::mor1kx-generic:0' in serial
+
+def test_find_core_files(tmpdir):
+    root = tmpdir.join('lib')
+    for f in ['a/a.core',
+              'a/sub/hidden.core',
+              'b/b2.core',
+              'b/b1.core',
+              '.git/objects/git.core',
+              'build/sim/build.core',
+              'c/vendor/d/vendor.core',
+              'c/e/e.core',
+              'c/e/ignored.core']:
+        root.join(*f.split('/')).write('', ensure=True)
+    root.join('.fusesocignore').write("# Comment\nbuild\nc/vendor\nignored.core\n")
+    #Symlink loop and a second link to an already scanned directory
+    root.join('d').mkdir()
+    root.join('d', 'loop').mksymlinkto(root)
+    root.join('link').mksymlinkto(root.join('c'))
+
+    visited = []
+    found = CoreManager().find_core_files(str(root), visited)
+    assert [os.path.relpath(f, str(root)) for f in found] == \
+        ['a/a.core', 'b/b1.core', 'b/b2.core', 'c/e/e.core']
+    assert not [d for d in visited if '.git' in d]
+
+def test_manifest(cm, tmpdir, write_core, names):
+    root = tmpdir.join('lib')
+    write_core('lib/a/a.core', '::a:1.0')
+    write_core('lib/b/b.core', '::b:1.0')
+    root.join('b', 'b.system').write("SAPI=1\n[main]\nbackend = icestorm\n")
+    assert cm.write_manifest(str(root)) == 2
+
+    #The library can be moved, and files can be touched as long as they don't change
+    moved = tmpdir.join('moved')
+    shutil.copytree(str(root), str(moved))
+    os.utime(str(moved.join('a', 'a.core')), (0, 0))
+    manifest = read_manifest(str(moved))
+    assert [f for (f, c) in manifest] == [str(moved.join('a', 'a.core')),
+                                          str(moved.join('b', 'b.core'))]
+    cm.load_cores(str(moved))
+    assert sorted(names(cm.db.find())) == ['::a:1.0', '::b:1.0']
+    assert cm.db.find('::b:1.0').core_root == str(moved.join('b'))
+    assert cm.db.find('::b:1.0').main.backend == 'icestorm'
+
+    #Any modified file invalidates the manifest
+    write_core('moved/b/b.core', '::b:2.0')
+    assert read_manifest(str(moved)) is None
+    cm.load_cores(str(moved))
+    assert '::b:2.0' in names(cm.db.find())
+
+    #The manifest only holds data. Anything else, like a pickle that would
+    #run code when it is loaded, is ignored
+    manifest = root.join('.fusesoc-manifest')
+    assert json.loads(manifest.read())['cores'][1]['core']['main']['backend'] == 'icestorm'
+    class Exploit(object):
+        def __reduce__(self):
+            return (os.mkdir, (str(tmpdir.join('exploited')),))
+    manifest.write_binary(pickle.dumps(Exploit()))
+    assert read_manifest(str(root)) is None
+    assert not tmpdir.join('exploited').check()
+
+def test_deferred_imports(tmpdir):
+    code = "import sys, fusesoc.main; print(' '.join(sys.modules))"
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(tests_dir))
+    modules = subprocess.check_output([sys.executable, '-c', code],
+                                      cwd=str(tmpdir), env=env).decode('utf-8').split()
+    for m in ['simplesat', 'okonomiyaki', 'ipyxact']:
+        assert not m in modules
+
+def test_solver_pool_reuse(cm, tmpdir, write_core, names):
+    root = tmpdir.join('lib')
+    write_core('lib/a/a.core', '::a:1.0', '::b', "[icarus]\ndepend = ::c\n")
+    write_core('lib/b/b.core', '::b:1.0')
+    write_core('lib/c/c.core', '::c:1.0')
+    cm.load_cores(str(root))
+
+    a = Vlnv('::a')
+    assert names(cm.db.solve(a, '')) == ['::b:1.0', '::a:1.0']
+    assert names(cm.db.solve(a, 'icarus')) == ['::b:1.0', '::c:1.0', '::a:1.0']
+    #Tool-specific dependencies don't leak into other solves
+    assert names(cm.db.solve(a, '')) == ['::b:1.0', '::a:1.0']
+    assert cm.db.find('::a:1.0').depend == (Vlnv('::b'),)
+
+    pool = cm.db._get_pool(a, 'icarus')
+    assert cm.db._get_pool(a, 'icarus') is pool
+
+    #Adding a core invalidates the pools
+    cm.load_core(write_core('lib/b2/b.core', '::b:2.0'))
+    assert cm.db._get_pool(a, 'icarus') is not pool
+    assert names(cm.db.solve(a, 'icarus')) == ['::b:2.0', '::c:1.0', '::a:1.0']
+
+def test_resolution_cache(cm, tmpdir, monkeypatch, write_core, names):
+    root = tmpdir.join('lib')
+    write_core('lib/a/a.core', '::a:1.0', '::b')
+    write_core('lib/b/b.core', '::b:1.0')
+    write_core('lib/c/c.core', '::c:1.0')
+    monkeypatch.setattr(Config(), 'resolve_cache', True)
+    cm.load_cores(str(root))
+
+    def fail(top_core, tool):
+        raise AssertionError("Solved again")
+
+    a = Vlnv('::a')
+    assert names(cm.get_depends(a)) == ['::b:1.0', '::a:1.0']
+    cm.db._solve = fail
+    assert names(cm.get_depends(a)) == ['::b:1.0', '::a:1.0']
+
+    #The resolution is loaded from disk in a new session...
+    monkeypatch.setattr(CoreManager, 'db', CoreDB())
+    monkeypatch.setattr(cm, '_index', None)
+    cm.load_cores(str(root))
+    cm.db._solve = fail
+    assert names(cm.get_depends(a)) == ['::b:1.0', '::a:1.0']
+    #...and isn't affected by changes to unrelated cores
+    cm.load_core(write_core('lib/c/c.core', '::c:1.0', '::a'))
+    assert names(cm.get_depends(a)) == ['::b:1.0', '::a:1.0']
+
+    #A new version of a dependency invalidates it
+    del cm.db._solve
+    cm.load_core(write_core('lib/b2/b.core', '::b:2.0'))
+    assert names(cm.get_depends(a)) == ['::b:2.0', '::a:1.0']
+
+def test_resolution_cache_missing_dependency(cm, tmpdir, monkeypatch, write_core, names):
+    root = tmpdir.join('lib')
+    write_core('lib/a/a.core', '::a:1.0', '::b')
+    write_core('lib/b1/b.core', '::b:1.0')
+    write_core('lib/b2/b.core', '::b:2.0', '::d')
+    monkeypatch.setattr(Config(), 'resolve_cache', True)
+    cm.load_cores(str(root))
+    a = Vlnv('::a')
+    assert names(cm.get_depends(a)) == ['::b:1.0', '::a:1.0']
+
+    #A dependency that was missing appears in a later session
+    write_core('lib/d/d.core', '::d:1.0')
+    monkeypatch.setattr(CoreManager, 'db', CoreDB())
+    monkeypatch.setattr(cm, '_index', None)
+    cm.load_cores(str(root))
+    assert names(cm.get_depends(a)) == ['::d:1.0', '::b:2.0', '::a:1.0']
+
+def test_solver_pool_pruning(cm, tmpdir, write_core):
+    root = tmpdir.join('lib')
+    write_core('lib/a/a.core', '::a:1.0', '::b', "[icarus]\ndepend = ::c\n")
+    write_core('lib/b1/b.core', '::b:1.0')
+    write_core('lib/b2/b.core', '::b:2.0', '::d')
+    write_core('lib/c/c.core', '::c:1.0')
+    write_core('lib/d/d.core', '::d:1.0')
+    write_core('lib/e/e.core', '::e:1.0', '::a')
+    cm.load_cores(str(root))
+
+    def pool_names(tool):
+        (pool, repo, installed) = cm.db._get_pool(Vlnv('::a'), tool)
+        return sorted(str(p.core.name) for p in repo)
+
+    #All versions of reachable cores, but nothing that depends on the top
+    assert pool_names('') == ['::a:1.0', '::b:1.0', '::b:2.0', '::d:1.0']
+    assert pool_names('icarus') == ['::a:1.0', '::b:1.0', '::b:2.0', '::c:1.0', '::d:1.0']
+
+def test_fast_path(cm, monkeypatch, names):
+    cm.load_cores(cores_root)
+    used = []
+    fast_solve = cm.db._fast_solve
+    def _fast_solve(*args):
+        cores = fast_solve(*args)
+        used.append(cores is not None)
+        return cores
+    monkeypatch.setattr(cm.db, '_fast_solve', _fast_solve)
+
+    def solve_all():
+        result = {}
+        for core in cm.db.find():
+            for tool in ['', 'icarus', 'verilator']:
+                try:
+                    cores = cm.db._solve(core.name, tool)
+                    result[(core.name, tool)] = names(cores)
+                except (RuntimeError, DependencyError) as e:
+                    result[(core.name, tool)] = type(e)
+        return result
+
+    fast = solve_all()
+    monkeypatch.setattr(cm.db, 'fast_path', False)
+    #Both paths must give identical results, and most cores in the test
+    #library can take the fast path
+    assert solve_all() == fast
+    assert used.count(True) > len(used) / 2
+    assert used.count(False) > 0
+
+def test_lockfile(cm, tmpdir, monkeypatch, write_core, names):
+    from fusesoc.lockfile import LockFile
+    root = tmpdir.join('lib')
+    write_core('lib/a/a.core', '::a:1.0', '::b', "[icarus]\ndepend = ::c\n")
+    write_core('lib/b1/b.core', '::b:1.0')
+    write_core('lib/c/c.core', '::c:1.0')
+    monkeypatch.chdir(str(tmpdir))
+    monkeypatch.setattr(cm, 'tool', 'icarus')
+    cm.load_cores(str(root))
+
+    a = Vlnv('::a:1.0')
+    lockfile = LockFile('fusesoc.lock')
+    for tool in ['', 'icarus']:
+        lockfile.set(a, tool, cm._solve(a, tool))
+    lockfile.save()
+
+    assert LockFile('fusesoc.lock').systems == lockfile.systems
+    assert names(LockFile('fusesoc.lock').get(a, '', cm.db)) == ['::b:1.0', '::a:1.0']
+
+    #Locked dependencies are used without resolving them again, even if a
+    #newer version of a dependency becomes available
+    cm.load_core(write_core('lib/b2/b.core', '::b:2.0'))
+    def fail(top_core, tool):
+        raise AssertionError("Solved again")
+    cm._solve = fail
+    assert names(cm.get_depends(a)) == ['::b:1.0', '::c:1.0', '::a:1.0']
+
+    #A modified core makes the lockfile stale
+    write_core('lib/c/c.core', '::c:1.0', '::b')
+    with pytest.raises(RuntimeError):
+        lockfile.get(a, 'icarus', cm.db)
+    del cm._solve
+    assert names(cm.get_depends(a)) == ['::b:2.0', '::c:1.0', '::a:1.0']
+
+def test_dependency_views(cm):
+    cm.load_cores(cores_root)
+    core = cm.db.find(Vlnv('::mor1kx-generic:0'))
+    depend = core.depend
+    icarus = core.depends('icarus')
+    assert icarus == depend + core.tool_depend('icarus')
+    assert core.depends('icarus') is icarus
+
+    #Resolving dependencies repeatedly leaves the cores untouched
+    for i in range(3):
+        for tool in ['', 'icarus', 'verilator']:
+            try:
+                cm.db._solve(core.name, tool)
+            except RuntimeError:
+                pass
+    assert core.depend is depend
+    assert core.depends('icarus') is icarus
+    assert core.depends('') == depend
+
+def test_solve_many(cm):
+    cm.load_cores(cores_root)
+    requests = [(Vlnv('mor1kx-generic'), ''),
+                (Vlnv('verilator_tb_utils'), 'verilator'),
+                (Vlnv('nosuchcore'), ''),
+                (Vlnv('mor1kx-generic'), '')]
+    results = cm.solve_many(requests)
+    assert len(results) == 4
+    for ((core, tool), (cores, error)) in zip(requests[:2], results[:2]):
+        assert error is None
+        assert cores == cm.db._solve(core, tool)
+    assert results[2][0] is None
+    assert 'nosuchcore' in results[2][1]
+    assert results[3] == results[0]
+
+def test_dependency_graph(cm, tmpdir, write_core, names):
+    root = tmpdir.join('lib')
+    write_core('lib/a/a.core', '::a:1.0', '::b', "[icarus]\ndepend = ::c\n")
+    write_core('lib/b1/b.core', '::b:1.0')
+    write_core('lib/b2/b.core', '::b:2.0', '::d')
+    write_core('lib/c/c.core', '::c:1.0', '>=::d:2.0')
+    write_core('lib/d/d.core', '::d:1.0')
+    write_core('lib/e/e.core', '::e:1.0', '=::b:1.0')
+    cm.load_cores(str(root))
+    db = cm.db
+
+    assert names(db.required_by(Vlnv('::b'))) == ['::a:1.0', '::e:1.0']
+    assert names(db.required_by(Vlnv('::b:2.0'))) == ['::a:1.0']
+    assert names(db.all_required_by(Vlnv('::d'))) == ['::a:1.0', '::b:2.0']
+    assert names(db.all_required_by(Vlnv('::c'), 'verilator')) == []
+    assert names(db.all_required_by(Vlnv('::c'), 'icarus')) == ['::a:1.0']
+    assert names(db.requires(Vlnv('::a:1.0'))) == ['::b:1.0', '::b:2.0', '::c:1.0']
+    assert names(db.requires(Vlnv('::a:1.0'), '', [Vlnv('::b:1.0')])) == ['::b:1.0']
+
+    #The index follows cores that are added, replaced and removed
+    cm.load_core(write_core('lib/d2/d.core', '::d:2.0'))
+    assert names(db.required_by(Vlnv('::d:2.0'))) == ['::b:2.0', '::c:1.0']
+    cm.load_core(write_core('lib/c/c.core', '::c:1.0'))
+    assert names(db.required_by(Vlnv('::d:2.0'))) == ['::b:2.0']
+    db.remove('::b:2.0')
+    assert names(db.all_required_by(Vlnv('::d'))) == []
+
+    #Versions compare like they do in the solver
+    cm.load_core(write_core('lib/f/f.core', '::f:1.0', '=::d:1.0.0'))
+    assert names(db.required_by(Vlnv('::d:1.0'))) == ['::f:1.0']
+    assert names(db.requires(Vlnv('::f:1.0'))) == ['::d:1.0']
+    assert names(cm.db._solve(Vlnv('::f:1.0'), '')) == ['::d:1.0', '::f:1.0']
+
+def test_load_errors(cm, tmpdir, write_core, names):
+    root = tmpdir.join('lib')
+    write_core('lib/a/a.core', '::a:1.0', '::b')
+    write_core('lib/b1/b.core', '::b:1.0')
+    write_core('lib/b2/b.core', '::b:2.0', '', "[fileset rtl]\nfiles = b.v[file_type=bogus]\n")
+    write_core('lib/c/c.core', '::c:1.0', '', "[provider]\nname = bogus\n")
+    cm.load_cores(str(root))
+
+    #Errors are raised every time, without leaving a half-parsed core
+    b2 = cm.db.find('::b:2.0')
+    for i in range(2):
+        with pytest.raises(SyntaxError):
+            b2.file_sets
+    c = cm.db.find('::c:1.0')
+    for i in range(2):
+        with pytest.raises(ImportError):
+            c.provider
+
+    #Cores that fail to parse are dropped when they are first used
+    assert names(cm.get_depends(Vlnv('::a'))) == ['::b:1.0', '::a:1.0']
+    assert sorted(cm.get_cores()) == ['::a:1.0', '::b:1.0']
+
+def test_bad_lockfile(cm, tmpdir, monkeypatch, write_core, names):
+    import argparse
+    from fusesoc.lockfile import LockFile
+    from fusesoc.main import lock
+    root = tmpdir.join('lib')
+    write_core('lib/a/a.core', '::a:1.0', '::b')
+    write_core('lib/b/b.core', '::b:1.0')
+    monkeypatch.chdir(str(tmpdir))
+    cm.load_cores(str(root))
+
+    #An unreadable lock file is ignored...
+    for content in ['not json', '{"version": 99, "systems": {}}']:
+        tmpdir.join('fusesoc.lock').write(content)
+        assert names(cm.get_depends(Vlnv('::a:1.0'), '')) == ['::b:1.0', '::a:1.0']
+
+    #...and replaced by 'fusesoc lock'
+    lock(argparse.Namespace(system='::a:1.0', tool=None))
+    assert LockFile('fusesoc.lock').has(Vlnv('::a:1.0'), '')
@@ -0,0 +1,103 @@
+import argparse
+import pytest
+
+from fusesoc.config import Config
+from fusesoc.edatool import EdaTool
+from fusesoc.vlnv import Vlnv
+
+class DummyTool(EdaTool):
+    TOOL_TYPE = 'sim'
+
+def _write_library(tmpdir, write_core, names, top='top'):
+    write_core('lib/{0}/{0}.core'.format(top), '::{}:0'.format(top), ' '.join(names))
+    for name in names:
+        src = tmpdir.join('remote', name + '.v')
+        src.write("module {}; endmodule\n".format(name), ensure=True)
+        write_core('lib/{0}/{0}.core'.format(name), '::{}:0'.format(name), '', """
+[fileset rtl]
+files = {name}.v
+file_type = verilogSource
+
+[provider]
+name = url
+url = file://{src}
+filetype = simple
+""".format(name=name, src=str(src)))
+    return tmpdir.join('lib')
+
+@pytest.mark.parametrize('fetch_jobs', [1, 4])
+def test_fetch_jobs(cm, tmpdir, monkeypatch, fetch_jobs, write_core):
+    monkeypatch.setattr(Config(), 'fetch_jobs', fetch_jobs)
+
+    names = ['r{}'.format(i) for i in range(6)]
+    lib = _write_library(tmpdir, write_core, names)
+    cm.load_cores(str(lib))
+
+    tool = DummyTool(cm.db.find(Vlnv('::top:0')), export=True)
+    tool.configure([])
+    for name in names:
+        assert tmpdir.join('build', 'top_0', 'src', name + '_0', name + '.v').check()
+
+    #A failed fetch is reported
+    lib.join('r0', 'r0.core').write(lib.join('r0', 'r0.core').read().replace('r0.v', 'missing.v'))
+    tmpdir.join('cache').remove()
+    cm.load_core(str(lib.join('r0', 'r0.core')))
+    tool = DummyTool(cm.db.find(Vlnv('::top:0')), export=True)
+    with pytest.raises(RuntimeError):
+        tool.configure([])
+
+def test_fetch_io_error(cm, tmpdir, monkeypatch, write_core):
+    monkeypatch.setattr(Config(), 'fetch_jobs', 2)
+    lib = _write_library(tmpdir, write_core, ['r0', 'r1'])
+    cm.load_cores(str(lib))
+
+    #I/O errors in the middle of a fetch are reported like other failures
+    def fetch():
+        raise IOError("Connection reset by peer")
+    cm.db.find(Vlnv('::r1:0')).provider.fetch = fetch
+    tool = DummyTool(cm.db.find(Vlnv('::top:0')), export=True)
+    with pytest.raises(RuntimeError) as e:
+        tool.configure([])
+    assert "Problem while fetching '::r1:0': Connection reset by peer" in str(e.value)
+
+def test_fetch_systems(cm, tmpdir, monkeypatch, write_core):
+    from fusesoc.main import fetch
+    monkeypatch.setattr(Config(), 'fetch_jobs', 3)
+    _write_library(tmpdir, write_core, ['r0', 'r1', 'r2'], 'top1')
+    lib = _write_library(tmpdir, write_core, ['r1', 'r3'], 'top2')
+    _write_library(tmpdir, write_core, ['r4'], 'top3')
+    cm.load_cores(str(lib))
+
+    systems = tmpdir.join('systems.txt')
+    systems.write("top1\n#A comment\ntop2\n")
+    args = argparse.Namespace(all=False, systems=str(systems), core=None)
+    fetch(args)
+    cache = tmpdir.join('cache')
+    assert sorted(x.basename for x in cache.listdir() if x.check(dir=True) and x.basename.startswith('r')) == \
+        ['r0_0', 'r1_0', 'r2_0', 'r3_0']
+
+    #Failures are collected and reported at the end
+    tmpdir.join('remote', 'r4.v').remove()
+    systems.write("top3\nnosuchcore\n")
+    with pytest.raises(SystemExit):
+        fetch(args)
+
+    cache.remove()
+    with pytest.raises(SystemExit):
+        fetch(argparse.Namespace(all=True, systems=None, core=None))
+    assert cache.join('r3_0', 'r3.v').check()
+
+def test_fetch_shared_cache_dir(cm, tmpdir, write_core):
+    from fusesoc.main import fetch
+    lib = _write_library(tmpdir, write_core, ['r0', 'r1'])
+    cm.load_cores(str(lib))
+
+    #Cores that share a cache directory only fetch it once
+    (r0, r1) = cm.load_fully([cm.db.find(Vlnv('::{}:0'.format(n))) for n in ['r0', 'r1']])
+    r1.files_root = r1.provider.files_root = r0.files_root
+    fetched = []
+    for core in [r0, r1]:
+        core.provider.fetch = lambda name=core.name: fetched.append(name) or True
+
+    fetch(argparse.Namespace(all=True, systems=None, core=None))
+    assert len(fetched) == 1
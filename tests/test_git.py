@@ -0,0 +1,48 @@
+import os
+import subprocess
+import pytest
+
+from fusesoc.config import Config
+from fusesoc.provider.git import Git
+
+def _git(repo, *args):
+    return subprocess.check_output(['git', '-C', repo] + list(args)).decode().strip()
+
+@pytest.fixture
+def repo(tmpdir, monkeypatch):
+    for (k, v) in [('GIT_AUTHOR_NAME', 'test'), ('GIT_AUTHOR_EMAIL', 'test@example.com'),
+                   ('GIT_COMMITTER_NAME', 'test'), ('GIT_COMMITTER_EMAIL', 'test@example.com')]:
+        monkeypatch.setenv(k, v)
+    repo = str(tmpdir.join('repo'))
+    subprocess.check_call(['git', 'init', '-q', repo])
+    for version in ['v1', 'v2']:
+        tmpdir.join('repo', 'version.txt').write(version)
+        _git(repo, 'add', 'version.txt')
+        _git(repo, 'commit', '-q', '-m', version)
+        _git(repo, 'tag', version)
+    return repo
+
+def test_git_mirrors(tmpdir, monkeypatch, repo):
+    cache_root = tmpdir.join('cache')
+    monkeypatch.setattr(Config(), 'cache_root', str(cache_root))
+    monkeypatch.setattr(Config(), 'git_mirrors', True)
+
+    def checkout(version, name):
+        provider = Git('::a:0', {'repo' : repo, 'version' : version},
+                       str(tmpdir), str(cache_root.join(name)))
+        assert provider.fetch()
+        return cache_root.join(name, 'version.txt').read()
+
+    assert checkout('v1', 'a_1') == 'v1'
+    assert checkout('v2', 'a_2') == 'v2'
+    #All versions share one mirror
+    assert len(cache_root.join('git').listdir()) == 1
+
+    #Tags and commits that are already mirrored don't need the repository
+    sha = _git(repo, 'rev-parse', 'v1')
+    os.rename(repo, repo + '.moved')
+    assert checkout(sha, 'a_sha') == 'v1'
+
+    #Removed cache directories can be checked out again
+    cache_root.join('a_1').remove()
+    assert checkout('v1', 'a_1') == 'v1'
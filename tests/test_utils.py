@@ -0,0 +1,32 @@
+import os
+import threading
+
+from fusesoc.utils import atomic_open
+
+def test_atomic_open_threads(tmpdir):
+    path = str(tmpdir.join('sub', 'data'))
+    errors = []
+    def write(i):
+        try:
+            for j in range(50):
+                with atomic_open(path) as f:
+                    f.write(str(i) * 1000)
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    #Every write is complete, and no temporary files are left behind
+    assert errors == []
+    with open(path) as f:
+        data = f.read()
+    assert len(data) == 1000 and len(set(data)) == 1
+    assert os.listdir(str(tmpdir.join('sub'))) == ['data']
+
+    #The file gets the usual permissions, not the private ones of mkstemp
+    umask = os.umask(0)
+    os.umask(umask)
+    assert os.stat(path).st_mode & 0o777 == 0o666 & ~umask
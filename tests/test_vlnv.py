@@ -65,3 +65,30 @@ def test_name_revision_legacy():
     assert vlnv_tuple(Vlnv("uart16550-r2")) == \
     ('', '', 'uart16550', '0', 2)
 
+
+def test_interned_vlnv():
+    import pickle
+    a = Vlnv("::uart16550:1.5")
+    assert Vlnv("::uart16550:1.5") is a
+    assert pickle.loads(pickle.dumps(a, 2)) is a
+    #Same core regardless of naming scheme and relation
+    assert Vlnv("uart16550-1.5") == a
+    assert Vlnv(">=::uart16550:1.5") == a
+    assert len(set([a, Vlnv("uart16550-1.5"), Vlnv("::uart16550:1.6")])) == 2
+    with pytest.raises(AttributeError):
+        a.relation = ">="
+
+def test_vlnv_with_relation():
+    a = Vlnv("::uart16550")
+    assert a.relation == ">="
+    b = a.with_relation("==")
+    assert b.relation == "=="
+    assert a.relation == ">="
+    assert str(b) == str(a)
+    assert a.with_relation("==") is b
+
+def test_vlnv_version_key():
+    vlnvs = [Vlnv("::a:1.10"), Vlnv("::a:1.9"), Vlnv("a-1.9-r1"),
+             Vlnv("::a:1.9rc1"), Vlnv("::a:0"), Vlnv("::a:1.9.1")]
+    assert [str(v) for v in sorted(vlnvs)] == \
+        ['::a:0', '::a:1.9rc1', '::a:1.9', '::a:1.9-r1', '::a:1.9.1', '::a:1.10']
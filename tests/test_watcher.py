@@ -0,0 +1,60 @@
+import os
+import sys
+import pytest
+
+from fusesoc.watcher import LibraryWatcher, watched_core_files, _Inotify, _state_file
+
+def test_watcher_scan(cm, tmpdir, write_core, names):
+    root1 = tmpdir.join('lib1')
+    root2 = tmpdir.join('lib2')
+    write_core('lib1/a/a.core', '::a:1.0')
+    write_core('lib2/b/b.core', '::b:1.0')
+    roots = [str(root1), str(root2)]
+
+    watcher = LibraryWatcher(cm, roots, polling=True)
+    for root in roots:
+        assert watcher.scan(root)
+    assert sorted(names(cm.db.find())) == ['::a:1.0', '::b:1.0']
+    assert watched_core_files(str(root1)) == [str(root1.join('a', 'a.core'))]
+
+    #Nothing changed
+    assert not watcher.scan(str(root1))
+
+    #Added core
+    write_core('lib1/c/c.core', '::c:1.0')
+    assert watcher.scan(str(root1))
+    assert sorted(names(cm.db.find())) == ['::a:1.0', '::b:1.0', '::c:1.0']
+
+    #Core in a later root shadows the one in an earlier root
+    write_core('lib2/c/c.core', '::c:1.0')
+    assert watcher.scan(str(root2))
+    assert cm.db.find('::c:1.0').core_root == str(root2.join('c'))
+
+    #...and the earlier one comes back when it is removed
+    root2.join('c', 'c.core').remove()
+    assert watcher.scan(str(root2))
+    assert cm.db.find('::c:1.0').core_root == str(root1.join('c'))
+
+    #Modified core
+    write_core('lib1/a/a.core', '::a:2.0', '', '\n')
+    assert watcher.scan(str(root1))
+    assert sorted(names(cm.db.find())) == ['::a:2.0', '::b:1.0', '::c:1.0']
+
+def test_watcher_state_timeout(cm, tmpdir, write_core):
+    root = tmpdir.join('lib')
+    write_core('lib/a/a.core', '::a:1.0')
+
+    watcher = LibraryWatcher(cm, [str(root)], interval=0.01, polling=True)
+    watcher.scan(str(root))
+    #The state is ignored once the watcher stops updating it
+    os.utime(_state_file(str(root)), (0, 0))
+    assert watched_core_files(str(root)) is None
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="Requires inotify")
+def test_inotify(tmpdir):
+    inotify = _Inotify()
+    inotify.watch(str(tmpdir))
+    assert inotify.wait(0) == []
+    tmpdir.join('x.core').write('')
+    assert str(tmpdir) in inotify.wait(1)
+    inotify.close()